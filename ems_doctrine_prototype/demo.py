@@ -6,6 +6,7 @@ Shows key capabilities of the Phase 0 system
 
 import sys
 import os
+from collections import Counter
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from ems_doctrine.document_processing import DocumentProcessor
@@ -55,7 +56,7 @@ def main():
 
     # Initialize components
     print_section("Initializing System Components")
-    entity_recognizer = EMSEntityRecognizer()
+    entity_recognizer = EMSEntityRecognizer(lazy=True)
     rule_extractor = RuleExtractor()
     knowledge_graph = KnowledgeGraph()
     print("✅ All components initialized successfully")
@@ -79,13 +80,11 @@ def main():
     rules = rule_extractor.extract_rules(sample_text, "demo_document")
 
     print(f"Found {len(rules)} rules:")
-    obligations = [r for r in rules if r.rule_type == DeonticType.OBLIGATION]
-    permissions = [r for r in rules if r.rule_type == DeonticType.PERMISSION]
-    prohibitions = [r for r in rules if r.rule_type == DeonticType.PROHIBITION]
+    rule_counts = Counter(r.rule_type for r in rules)
 
-    print(f"  Obligations: {len(obligations)}")
-    print(f"  Permissions: {len(permissions)}")
-    print(f"  Prohibitions: {len(prohibitions)}")
+    print(f"  Obligations: {rule_counts[DeonticType.OBLIGATION]}")
+    print(f"  Permissions: {rule_counts[DeonticType.PERMISSION]}")
+    print(f"  Prohibitions: {rule_counts[DeonticType.PROHIBITION]}")
 
     print("\nSample Rules:")
     for rule in rules[:5]:  # Show first 5 rules
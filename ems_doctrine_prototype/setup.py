@@ -23,11 +23,10 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.9",
+    python_requires=">=3.10",
     install_requires=requirements,
     extras_require={
         "dev": [
@@ -36,6 +35,14 @@ setup(
             "black>=23.0.0",
             "flake8>=6.0.0",
         ],
+        "fast": [
+            "google-re2>=1.1",
+            "orjson>=3.8",
+            "numba>=0.58",
+        ],
+        "server": [
+            "gunicorn>=21.2",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,98 @@
+"""
+On-disk cache of entity and rule extraction results for the demo scripts,
+which run the same hardcoded doctrine text on every invocation.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from . import __version__
+from .config import config
+from .entity_recognition import EMSEntityRecognizer, Entity
+from .rule_extraction import RuleExtractor, Rule
+
+# Bump whenever entity labels, the Rule/Entity fields or extraction output
+# change, so stale pickles are not reused
+CACHE_VERSION = 1
+
+# Cache directory, overridable with the EMS_DEMO_CACHE_DIR environment variable
+CACHE_DIR = Path(os.getenv("EMS_DEMO_CACHE_DIR", "~/.cache/ems_doctrine")).expanduser()
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_path(texts: List[str], document_names: List[str], recognizer: EMSEntityRecognizer,
+                with_rules: bool) -> Path:
+    """
+    Get the pickle path for a batch of texts and their document names.
+
+    The key also covers the recognizer's mode and its configured dictionary
+    terms, which change the entities found without changing the texts.
+    """
+    # Sorted per label by _dictionary_phrases, so the dump is stable
+    dictionary = json.dumps(recognizer._dictionary_phrases(), sort_keys=True)
+    digest = hashlib.sha256()
+    for part in (str(CACHE_VERSION), __version__, config.spacy_model, str(with_rules),
+                 str(recognizer.lazy), dictionary, *document_names, *texts):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return CACHE_DIR / f"{digest.hexdigest()}.pkl"
+
+
+def cached_nlp(texts: List[str], recognizer: EMSEntityRecognizer, extractor: Optional[RuleExtractor],
+               document_names: Optional[List[str]] = None) -> List[Tuple[List[Entity], List[Rule]]]:
+    """
+    Extract entities and rules from texts, reusing the results of an earlier run.
+
+    The whole batch is cached as one pickle, so rule ids stay those of the
+    run that filled the cache. On a miss the texts are extracted in one
+    batched pass each by ``recognizer`` and ``extractor``.
+
+    Args:
+        texts: Input texts to analyze
+        recognizer: Entity recognizer used on a cache miss
+        extractor: Rule extractor used on a cache miss, or None to extract
+            no rules
+        document_names: Optional source document name for each text
+
+    Returns:
+        One (entities, rules) pair per text
+    """
+    if document_names is None:
+        document_names = [""] * len(texts)
+    path = _cache_path(texts, document_names, recognizer, extractor is not None)
+
+    try:
+        with open(path, 'rb') as f:
+            results = pickle.load(f)
+        logger.info(f"Loaded extraction results from {path}")
+        return results
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable demo cache {path}: {e}")
+
+    entities = recognizer.extract_entities_batch(texts)
+    if extractor is not None:
+        rules = extractor.extract_rules_batch(texts, document_names=document_names)
+    else:
+        rules = [[] for _ in texts]
+    results = list(zip(entities, rules))
+
+    # Write to a temporary file first so an interrupted run leaves no
+    # truncated pickle behind
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write demo cache {path}: {e}")
+
+    return results
@@ -5,33 +5,210 @@ Provides REST endpoints for document processing, entity recognition, and knowled
 
 import os
 import json
+import hashlib
 import logging
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any
-from flask import Flask, request, jsonify, render_template_string
+from typing import Dict, List, Any, Callable, Hashable, Optional, Sequence, Tuple
+from flask import Flask, Response, request, jsonify, render_template_string
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
 import tempfile
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .config import config
 from .document_processing import DocumentProcessor
 from .entity_recognition import EMSEntityRecognizer
 from .knowledge_graph import KnowledgeGraph
-from .rule_extraction import RuleExtractor, DeonticType
+from .rule_extraction import Rule, RuleExtractor, DeonticType
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which serializes dataclasses and enums natively."""
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        # Knowledge graph properties come back as read-only mappings
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Hand orjson's bytes to the response without a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default),
+                                        mimetype="application/json")
+
+
 # Initialize Flask app
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
-# Initialize components
-doc_processor = DocumentProcessor()
-entity_recognizer = EMSEntityRecognizer()
-knowledge_graph = KnowledgeGraph()
-rule_extractor = RuleExtractor()
+
+# Components are created on first use so importing the API (or the CLI,
+# which imports it) does not pay for loading spaCy models up front.
+@lru_cache(maxsize=None)
+def get_document_processor() -> DocumentProcessor:
+    """Get the shared document processor."""
+    return DocumentProcessor()
+
+
+@lru_cache(maxsize=None)
+def get_entity_recognizer() -> EMSEntityRecognizer:
+    """Get the shared entity recognizer."""
+    return EMSEntityRecognizer()
+
+
+@lru_cache(maxsize=None)
+def get_knowledge_graph() -> KnowledgeGraph:
+    """Get the shared knowledge graph."""
+    return KnowledgeGraph()
+
+
+@lru_cache(maxsize=None)
+def get_rule_extractor() -> RuleExtractor:
+    """Get the shared rule extractor."""
+    return RuleExtractor()
+
+
+# Results of expensive read-only queries with the fingerprint of the data they
+# were computed from. Cleared whenever /process_document ingests new data.
+_query_cache: Dict[str, Tuple[Hashable, Any]] = {}
+
+
+def _cached_query(name: str, fingerprint: Hashable, compute: Callable[[], Any]) -> Any:
+    """Return the cached result for ``name`` if its fingerprint is unchanged."""
+    entry = _query_cache.get(name)
+    if entry is not None and entry[0] == fingerprint:
+        return entry[1]
+
+    result = compute()
+    _query_cache[name] = (fingerprint, result)
+    return result
+
+
+# Payloads of the text extraction endpoints keyed by a hash of their input.
+# Extraction is a pure function of the text, so repeated submissions of the
+# same passage are answered from here; least recently used entries are evicted.
+# Set api.extraction_cache_dir to also keep results on disk across processes.
+EXTRACTION_CACHE_SIZE = config.get('api.extraction_cache_size', 1024)
+_extraction_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_extraction_cache_lock = threading.Lock()
+
+
+def _cached_extraction(kind: str, parts: Sequence[str],
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the cached ``kind`` payload for the input ``parts``, computing it on a miss."""
+    digest = hashlib.blake2b(kind.encode(), digest_size=16)
+    for part in parts:
+        digest.update(b'\0' + part.encode())
+    key = digest.hexdigest()
+
+    with _extraction_cache_lock:
+        payload = _extraction_cache.get(key)
+        if payload is not None:
+            _extraction_cache.move_to_end(key)
+            return payload
+
+    cache_dir = config.get('api.extraction_cache_dir')
+    cache_file = Path(cache_dir) / f"{kind}_{key}.json" if cache_dir else None
+
+    if cache_file is not None and cache_file.exists():
+        payload = json.loads(cache_file.read_text())
+    else:
+        payload = compute()
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_file.write_text(json.dumps(payload))
+            os.replace(tmp_file, cache_file)
+
+    with _extraction_cache_lock:
+        _extraction_cache[key] = payload
+        while len(_extraction_cache) > EXTRACTION_CACHE_SIZE:
+            _extraction_cache.popitem(last=False)
+    return payload
+
+
+def _rule_to_dict(rule: Rule) -> Dict[str, Any]:
+    """Project a rule onto its API representation."""
+    return {
+        'id': rule.id,
+        'type': rule.rule_type.value,
+        'subject': rule.subject,
+        'action': rule.action,
+        'object': rule.object,
+        'condition': rule.condition,
+        'text': rule.text,
+        'confidence': rule.confidence,
+        'source_document': rule.source_document,
+        'section': rule.section
+    }
+
+
+def _page(items: Sequence) -> Tuple[Sequence, Dict[str, Any]]:
+    """
+    Slice items using the ``offset`` and ``limit`` query parameters.
+
+    Returns:
+        Tuple of (page of items, pagination fields for the response)
+    """
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit: Optional[int] = request.args.get('limit', type=int)
+
+    end = None if limit is None else offset + max(limit, 0)
+    return items[offset:end], {'total': len(items), 'offset': offset, 'limit': limit}
+
+
+def _kg_statistics() -> Dict[str, Any]:
+    """Get knowledge graph statistics, recomputed only when the graph changes."""
+    knowledge_graph = get_knowledge_graph()
+    return _cached_query('kg_statistics', knowledge_graph.version, knowledge_graph.get_statistics)
+
+
+# Versions restart at zero in every worker process, so ETags carry a
+# per-process tag to keep workers from vouching for each other's data
+_etag_prefix = uuid.uuid4().hex[:8]
+
+
+def _conditional_response(build: Callable[[], Response], *versions: int) -> Response:
+    """
+    Answer a GET with an ETag built from the versions of the data it depends on.
+
+    Returns ``304 Not Modified`` without calling ``build`` when the client
+    already holds the current representation. Callers pass only the versions
+    their response reads, so e.g. graph endpoints never load the rule extractor.
+    """
+    etag = "-".join((_etag_prefix, *map(str, versions)))
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/')
@@ -64,7 +241,7 @@ def index():
         <div class="endpoint">
             <h3><span class="method">POST</span> /process_document</h3>
             <p>Process a document and extract entities and rules</p>
-            <p><strong>Body:</strong> <code>{"file_path": "path/to/document.pdf"}</code></p>
+            <p><strong>Body:</strong> <code>{"file_path": "path/to/document.pdf"}</code>, or a multipart upload in the <code>file</code> field</p>
         </div>
 
         <div class="endpoint">
@@ -82,24 +259,25 @@ def index():
         <div class="endpoint">
             <h3><span class="method">GET</span> /knowledge_graph/nodes</h3>
             <p>Query knowledge graph nodes</p>
-            <p><strong>Parameters:</strong> <code>type</code> (optional)</p>
+            <p><strong>Parameters:</strong> <code>type</code>, <code>limit</code>, <code>offset</code> (all optional)</p>
         </div>
 
         <div class="endpoint">
             <h3><span class="method">GET</span> /knowledge_graph/relationships</h3>
             <p>Query knowledge graph relationships</p>
-            <p><strong>Parameters:</strong> <code>source</code>, <code>target</code>, <code>relationship</code> (all optional)</p>
+            <p><strong>Parameters:</strong> <code>source</code>, <code>target</code>, <code>relationship</code>, <code>limit</code>, <code>offset</code> (all optional)</p>
         </div>
 
         <div class="endpoint">
             <h3><span class="method">GET</span> /rules</h3>
             <p>Get extracted rules</p>
-            <p><strong>Parameters:</strong> <code>type</code> (obligation/permission/prohibition)</p>
+            <p><strong>Parameters:</strong> <code>type</code> (obligation/permission/prohibition), <code>limit</code>, <code>offset</code></p>
         </div>
 
         <div class="endpoint">
             <h3><span class="method">GET</span> /conflicts</h3>
             <p>Get detected rule conflicts</p>
+            <p><strong>Parameters:</strong> <code>limit</code>, <code>offset</code> (optional)</p>
         </div>
 
         <h2>Example Usage</h2>
@@ -121,21 +299,18 @@ curl "http://localhost:5000/knowledge_graph/nodes?type=FREQUENCY"
 def get_status():
     """Get system status and statistics."""
     try:
-        kg_stats = knowledge_graph.get_statistics()
-        rule_stats = rule_extractor.get_statistics()
-
-        return jsonify({
+        return _conditional_response(lambda: jsonify({
             'status': 'healthy',
             'version': config.version,
-            'knowledge_graph': kg_stats,
-            'rules': rule_stats,
+            'knowledge_graph': _kg_statistics(),
+            'rules': get_rule_extractor().get_statistics(),
             'components': {
                 'document_processor': 'active',
                 'entity_recognizer': 'active',
                 'knowledge_graph': 'active',
                 'rule_extractor': 'active'
             }
-        })
+        }), get_knowledge_graph().version, get_rule_extractor().version)
     except Exception as e:
         logger.error(f"Error getting status: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -145,60 +320,97 @@ def get_status():
 def process_document():
     """Process a document and extract all information."""
     try:
-        data = request.get_json()
+        upload = request.files.get('file')
+        if upload is not None:
+            # Werkzeug has already spooled the upload to a temporary file;
+            # copy it to disk under its own name so the document keeps it.
+            with tempfile.TemporaryDirectory() as upload_dir:
+                file_path = os.path.join(upload_dir, secure_filename(upload.filename) or 'upload.pdf')
+                upload.save(file_path)
+                return _process_document_file(file_path)
+
+        data = request.get_json(silent=True)
         if not data or 'file_path' not in data:
-            return jsonify({'error': 'file_path is required'}), 400
+            return jsonify({'error': 'file_path or file upload is required'}), 400
 
         file_path = data['file_path']
         if not os.path.exists(file_path):
             return jsonify({'error': f'File not found: {file_path}'}), 404
 
-        # Process document
-        document = doc_processor.process_file(file_path)
-
-        # Extract entities
-        entities = entity_recognizer.extract_entities(document.content)
-
-        # Extract rules
-        rules = rule_extractor.extract_rules(document.content, document.filename)
-
-        # Add to knowledge graph
-        knowledge_graph.add_entities_from_document(entities, document.filename)
-
-        # Extract relationships
-        relationships = entity_recognizer.extract_relationships(document.content, entities)
-        knowledge_graph.add_relationships_from_data(relationships, document.filename)
-
-        # Detect conflicts
-        conflicts = rule_extractor.detect_conflicts(rules)
-
-        return jsonify({
-            'document': {
-                'filename': document.filename,
-                'title': document.title,
-                'sections': len(document.sections),
-                'word_count': document.metadata.get('word_count', 0)
-            },
-            'entities': {
-                'total': len(entities),
-                'by_type': entity_recognizer.get_entity_statistics(entities)
-            },
-            'rules': {
-                'total': len(rules),
-                'obligations': len([r for r in rules if r.rule_type == DeonticType.OBLIGATION]),
-                'permissions': len([r for r in rules if r.rule_type == DeonticType.PERMISSION]),
-                'prohibitions': len([r for r in rules if r.rule_type == DeonticType.PROHIBITION])
-            },
-            'relationships': len(relationships),
-            'conflicts': len(conflicts),
-            'processing_complete': True
-        })
+        return _process_document_file(file_path)
 
     except Exception as e:
         logger.error(f"Error processing document: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _process_document_file(file_path: str) -> Response:
+    """Run the full extraction pipeline on a document file on disk."""
+    doc_processor = get_document_processor()
+    entity_recognizer = get_entity_recognizer()
+    knowledge_graph = get_knowledge_graph()
+    rule_extractor = get_rule_extractor()
+
+    # Process document
+    document = doc_processor.process_file(file_path)
+
+    # Both stages work paragraph by paragraph: entities so spaCy can batch
+    # them, rules so only one paragraph's parse is in memory at a time.
+    # They use separate spaCy pipelines and share no state, so the two
+    # stages run side by side.
+    paragraphs, offsets = doc_processor.split_paragraphs(document.content)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        analysis_future = executor.submit(entity_recognizer.analyze,
+                                          document.content, paragraphs, offsets)
+        rules_future = executor.submit(rule_extractor.extract_rules_from_sections,
+                                       (('', paragraph) for paragraph in paragraphs),
+                                       document.filename)
+
+        analysis = analysis_future.result()
+        rules = rules_future.result()
+    entities = analysis.entities
+
+    # Keep the rules for /rules, /conflicts and /status
+    rule_extractor.add_rules(rules)
+
+    # Add to knowledge graph
+    knowledge_graph.add_entities_from_document(entities, document.filename)
+
+    # Add relationships
+    relationships = analysis.relationships
+    knowledge_graph.add_relationships_from_data(relationships, document.filename)
+
+    # Detect conflicts
+    conflicts = rule_extractor.detect_conflicts(rules)
+
+    # Cached query results are stale now that new data has been ingested
+    _query_cache.clear()
+
+    rule_counts = Counter(rule.rule_type for rule in rules)
+
+    return jsonify({
+        'document': {
+            'filename': document.filename,
+            'title': document.title,
+            'sections': len(document.sections),
+            'word_count': document.metadata.get('word_count', 0)
+        },
+        'entities': {
+            'total': len(entities),
+            'by_type': analysis.stats
+        },
+        'rules': {
+            'total': len(rules),
+            'obligations': rule_counts[DeonticType.OBLIGATION],
+            'permissions': rule_counts[DeonticType.PERMISSION],
+            'prohibitions': rule_counts[DeonticType.PROHIBITION]
+        },
+        'relationships': len(relationships),
+        'conflicts': len(conflicts),
+        'processing_complete': True
+    })
+
+
 @app.route('/extract_entities', methods=['POST'])
 def extract_entities():
     """Extract entities from text."""
@@ -208,30 +420,36 @@ def extract_entities():
             return jsonify({'error': 'text is required'}), 400
 
         text = data['text']
-        entities = entity_recognizer.extract_entities(text)
-
-        entities_data = []
-        for entity in entities:
-            entities_data.append({
-                'text': entity.text,
-                'label': entity.label,
-                'start': entity.start,
-                'end': entity.end,
-                'confidence': entity.confidence,
-                'context': entity.context
-            })
-
-        return jsonify({
-            'entities': entities_data,
-            'total': len(entities),
-            'statistics': entity_recognizer.get_entity_statistics(entities)
-        })
+        return jsonify(_cached_extraction('entities', (text,), lambda: _extract_entities_payload(text)))
 
     except Exception as e:
         logger.error(f"Error extracting entities: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _extract_entities_payload(text: str) -> Dict[str, Any]:
+    """Build the /extract_entities response for ``text``."""
+    entity_recognizer = get_entity_recognizer()
+    entities = entity_recognizer.extract_entities(text)
+
+    entities_data = []
+    for entity in entities:
+        entities_data.append({
+            'text': entity.text,
+            'label': entity.label,
+            'start': entity.start,
+            'end': entity.end,
+            'confidence': entity.confidence,
+            'context': entity.context
+        })
+
+    return {
+        'entities': entities_data,
+        'total': len(entities),
+        'statistics': entity_recognizer.get_entity_statistics(entities)
+    }
+
+
 @app.route('/extract_rules', methods=['POST'])
 def extract_rules():
     """Extract rules from text."""
@@ -244,38 +462,32 @@ def extract_rules():
         document_name = data.get('document_name', 'api_input')
         section = data.get('section', '')
 
-        rules = rule_extractor.extract_rules(text, document_name, section)
-
-        rules_data = []
-        for rule in rules:
-            rules_data.append({
-                'id': rule.id,
-                'type': rule.rule_type.value,
-                'subject': rule.subject,
-                'action': rule.action,
-                'object': rule.object,
-                'condition': rule.condition,
-                'text': rule.text,
-                'confidence': rule.confidence,
-                'source_document': rule.source_document,
-                'section': rule.section
-            })
-
-        return jsonify({
-            'rules': rules_data,
-            'total': len(rules),
-            'statistics': {
-                'obligations': len([r for r in rules if r.rule_type == DeonticType.OBLIGATION]),
-                'permissions': len([r for r in rules if r.rule_type == DeonticType.PERMISSION]),
-                'prohibitions': len([r for r in rules if r.rule_type == DeonticType.PROHIBITION])
-            }
-        })
+        return jsonify(_cached_extraction('rules', (text, document_name, section),
+                                          lambda: _extract_rules_payload(text, document_name, section)))
 
     except Exception as e:
         logger.error(f"Error extracting rules: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _extract_rules_payload(text: str, document_name: str, section: str) -> Dict[str, Any]:
+    """Build the /extract_rules response for ``text``."""
+    rules = get_rule_extractor().extract_rules(text, document_name, section)
+
+    rules_data = [_rule_to_dict(rule) for rule in rules]
+    rule_counts = Counter(rule.rule_type for rule in rules)
+
+    return {
+        'rules': rules_data,
+        'total': len(rules),
+        'statistics': {
+            'obligations': rule_counts[DeonticType.OBLIGATION],
+            'permissions': rule_counts[DeonticType.PERMISSION],
+            'prohibitions': rule_counts[DeonticType.PROHIBITION]
+        }
+    }
+
+
 @app.route('/knowledge_graph/nodes')
 def query_nodes():
     """Query knowledge graph nodes."""
@@ -289,22 +501,12 @@ def query_nodes():
                 prop_name = key[5:]  # Remove 'prop_' prefix
                 properties[prop_name] = value
 
-        nodes = knowledge_graph.query_nodes(node_type, properties if properties else None)
-
-        nodes_data = []
-        for node in nodes:
-            nodes_data.append({
-                'id': node.id,
-                'label': node.label,
-                'type': node.type,
-                'properties': node.properties,
-                'source_document': node.source_document,
-                'confidence': node.confidence
-            })
+        nodes = get_knowledge_graph().query_nodes(node_type, properties if properties else None)
+        page, pagination = _page(nodes)
 
         return jsonify({
-            'nodes': nodes_data,
-            'total': len(nodes)
+            'nodes': page,
+            **pagination
         })
 
     except Exception as e:
@@ -320,21 +522,12 @@ def query_relationships():
         target = request.args.get('target')
         relationship = request.args.get('relationship')
 
-        edges = knowledge_graph.query_relationships(source, target, relationship)
-
-        edges_data = []
-        for edge in edges:
-            edges_data.append({
-                'source': edge.source,
-                'target': edge.target,
-                'relationship': edge.relationship,
-                'properties': edge.properties,
-                'confidence': edge.confidence
-            })
+        edges = get_knowledge_graph().query_relationships(source, target, relationship)
+        page, pagination = _page(edges)
 
         return jsonify({
-            'relationships': edges_data,
-            'total': len(edges)
+            'relationships': page,
+            **pagination
         })
 
     except Exception as e:
@@ -353,7 +546,7 @@ def find_paths():
         if not source or not target:
             return jsonify({'error': 'source and target parameters are required'}), 400
 
-        paths = knowledge_graph.find_paths(source, target, max_length)
+        paths = get_knowledge_graph().find_paths(source, target, max_length)
 
         return jsonify({
             'paths': paths,
@@ -375,7 +568,7 @@ def get_rules():
         rule_type = request.args.get('type')
         subject = request.args.get('subject')
 
-        rules = rule_extractor.rules
+        rules = get_rule_extractor().rules
 
         if rule_type:
             try:
@@ -387,24 +580,13 @@ def get_rules():
         if subject:
             rules = [r for r in rules if subject.lower() in r.subject.lower()]
 
-        rules_data = []
-        for rule in rules:
-            rules_data.append({
-                'id': rule.id,
-                'type': rule.rule_type.value,
-                'subject': rule.subject,
-                'action': rule.action,
-                'object': rule.object,
-                'condition': rule.condition,
-                'text': rule.text,
-                'confidence': rule.confidence,
-                'source_document': rule.source_document,
-                'section': rule.section
-            })
+        page, pagination = _page(rules)
+
+        rules_data = [_rule_to_dict(rule) for rule in page]
 
         return jsonify({
             'rules': rules_data,
-            'total': len(rules)
+            **pagination
         })
 
     except Exception as e:
@@ -416,34 +598,34 @@ def get_rules():
 def get_conflicts():
     """Get detected rule conflicts."""
     try:
-        conflicts = rule_extractor.detect_conflicts(rule_extractor.rules)
-
-        conflicts_data = []
-        for conflict in conflicts:
-            conflicts_data.append({
-                'rule1_id': conflict.rule1_id,
-                'rule2_id': conflict.rule2_id,
-                'conflict_type': conflict.conflict_type,
-                'description': conflict.description,
-                'confidence': conflict.confidence
-            })
-
-        return jsonify({
-            'conflicts': conflicts_data,
-            'total': len(conflicts)
-        })
+        return _conditional_response(_conflicts_response,
+                                     get_knowledge_graph().version, get_rule_extractor().version)
 
     except Exception as e:
         logger.error(f"Error getting conflicts: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _conflicts_response() -> Response:
+    """Build the /conflicts response."""
+    rule_extractor = get_rule_extractor()
+
+    fingerprint = hash(tuple(rule.id for rule in rule_extractor.rules))
+    conflicts = _cached_query('conflicts', fingerprint,
+                              lambda: rule_extractor.detect_conflicts(rule_extractor.rules))
+    page, pagination = _page(conflicts)
+
+    return jsonify({
+        'conflicts': page,
+        **pagination
+    })
+
+
 @app.route('/knowledge_graph/statistics')
 def get_kg_statistics():
     """Get knowledge graph statistics."""
     try:
-        stats = knowledge_graph.get_statistics()
-        return jsonify(stats)
+        return _conditional_response(lambda: jsonify(_kg_statistics()), get_knowledge_graph().version)
     except Exception as e:
         logger.error(f"Error getting KG statistics: {e}")
         return jsonify({'error': str(e)}), 500
@@ -455,7 +637,12 @@ def create_app():
 
 
 if __name__ == '__main__':
-    # Run the Flask app
+    # The Werkzeug server is for local development only; deploy with e.g.
+    #   gunicorn -w 4 -k gthread -t 30 "ems_doctrine.api:create_app()"
+    if not os.getenv('FLASK_DEV'):
+        raise SystemExit("Set FLASK_DEV=1 to run the development server, "
+                         "or serve ems_doctrine.api:create_app() with gunicorn")
+
     host = config.get('api.host', 'localhost')
     port = config.get('api.port', 5000)
     debug = config.get('api.debug', True)
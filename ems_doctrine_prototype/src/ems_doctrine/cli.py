@@ -4,6 +4,8 @@ Command-line interface for EMS Doctrine Prototype.
 
 import click
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 from .config import config
@@ -11,7 +13,24 @@ from .document_processing import DocumentProcessor
 from .entity_recognition import EMSEntityRecognizer
 from .knowledge_graph import KnowledgeGraph
 from .rule_extraction import RuleExtractor
-from .api import app
+
+
+@lru_cache(maxsize=2)
+def _get_recognizer(lazy: bool = False) -> EMSEntityRecognizer:
+    """Shared entity recognizer, so commands run in one process load spaCy once."""
+    return EMSEntityRecognizer(lazy=lazy)
+
+
+@lru_cache(maxsize=1)
+def _get_rule_extractor() -> RuleExtractor:
+    """Shared rule extractor."""
+    return RuleExtractor()
+
+
+@lru_cache(maxsize=1)
+def _get_knowledge_graph() -> KnowledgeGraph:
+    """Shared knowledge graph on the configured database."""
+    return KnowledgeGraph()
 
 
 @click.group()
@@ -31,9 +50,9 @@ def process_document(file_path, output):
 
     # Initialize components
     doc_processor = DocumentProcessor()
-    entity_recognizer = EMSEntityRecognizer()
-    kg = KnowledgeGraph()
-    rule_extractor = RuleExtractor()
+    entity_recognizer = _get_recognizer()
+    kg = _get_knowledge_graph()
+    rule_extractor = _get_rule_extractor()
 
     # Process document
     document = doc_processor.process_file(file_path)
@@ -41,17 +60,22 @@ def process_document(file_path, output):
     click.echo(f"Sections: {len(document.sections)}")
     click.echo(f"Word count: {document.metadata.get('word_count', 0)}")
 
-    # Extract entities
-    entities = entity_recognizer.extract_entities(document.content)
+    # Tokenize the document once, paragraph by paragraph, in spaCy batches
+    paragraphs, offsets = doc_processor.split_paragraphs(document.content)
+
+    # Extract entities, their statistics and relationships in one pass
+    analysis = entity_recognizer.analyze(document.content, paragraphs, offsets)
+    entities = analysis.entities
     click.echo(f"Entities extracted: {len(entities)}")
 
     # Show entity statistics
-    entity_stats = entity_recognizer.get_entity_statistics(entities)
-    for entity_type, count in entity_stats.items():
+    for entity_type, count in analysis.stats.items():
         click.echo(f"  {entity_type}: {count}")
 
     # Extract rules
-    rules = rule_extractor.extract_rules(document.content, document.filename)
+    rules = rule_extractor.extract_rules_from_sections((('', paragraph) for paragraph in paragraphs),
+                                                       document.filename)
+    rule_extractor.add_rules(rules)
     click.echo(f"Rules extracted: {len(rules)}")
 
     # Show rule statistics
@@ -63,8 +87,8 @@ def process_document(file_path, output):
     # Add to knowledge graph
     kg.add_entities_from_document(entities, document.filename)
 
-    # Extract relationships
-    relationships = entity_recognizer.extract_relationships(document.content, entities)
+    # Add relationships
+    relationships = analysis.relationships
     kg.add_relationships_from_data(relationships, document.filename)
     click.echo(f"Relationships extracted: {len(relationships)}")
 
@@ -93,11 +117,95 @@ def process_document(file_path, output):
     click.echo("✅ Processing complete!")
 
 
+def _parse_document(file_path: str):
+    """Parse one document file; runs in a worker process."""
+    return DocumentProcessor().process_file(file_path)
+
+
+@cli.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', help='Output directory for results')
+@click.option('--workers', '-w', type=int, default=None,
+              help='Number of processes parsing documents (default: CPU count)')
+def process_documents(directory, output, workers):
+    """Process every supported document in a directory."""
+    doc_processor = DocumentProcessor()
+    files = sorted(
+        path for path in Path(directory).iterdir()
+        if path.is_file() and path.suffix.lower().lstrip('.') in doc_processor.supported_formats
+    )
+    if not files:
+        click.echo(f"No supported documents found in {directory}")
+        return
+
+    click.echo(f"Processing {len(files)} documents from {directory}")
+
+    # Initialize components
+    entity_recognizer = _get_recognizer()
+    kg = _get_knowledge_graph()
+    rule_extractor = _get_rule_extractor()
+
+    all_rules = []
+    total_entities = 0
+    total_relationships = 0
+
+    # Documents are parsed in worker processes and extracted here as they
+    # arrive, so PDF parsing of later files overlaps extraction of earlier ones
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(path, executor.submit(_parse_document, str(path))) for path in files]
+        for path, future in futures:
+            try:
+                document = future.result()
+            except Exception as e:
+                click.echo(f"  {path.name}: skipped ({e})")
+                continue
+
+            paragraphs, offsets = doc_processor.split_paragraphs(document.content)
+
+            analysis = entity_recognizer.analyze(document.content, paragraphs, offsets)
+            entities, relationships = analysis.entities, analysis.relationships
+            rules = rule_extractor.extract_rules_from_sections((('', paragraph) for paragraph in paragraphs),
+                                                               document.filename)
+            rule_extractor.add_rules(rules)
+
+            kg.add_entities_from_document(entities, document.filename)
+            kg.add_relationships_from_data(relationships, document.filename)
+
+            click.echo(f"  {document.filename}: {len(entities)} entities, {len(rules)} rules, "
+                       f"{len(relationships)} relationships")
+
+            all_rules.extend(rules)
+            total_entities += len(entities)
+            total_relationships += len(relationships)
+
+    click.echo(f"Entities extracted: {total_entities}")
+    click.echo(f"Rules extracted: {len(all_rules)}")
+    click.echo(f"Relationships extracted: {total_relationships}")
+
+    # Detect conflicts across all documents
+    conflicts = rule_extractor.detect_conflicts(all_rules)
+    if conflicts:
+        click.echo(f"⚠️  Rule conflicts detected: {len(conflicts)}")
+        for conflict in conflicts[:3]:  # Show first 3 conflicts
+            click.echo(f"  {conflict.conflict_type}: {conflict.description}")
+
+    # Save results if output directory specified
+    if output:
+        output_dir = Path(output)
+        output_dir.mkdir(exist_ok=True)
+
+        kg_file = output_dir / "knowledge_graph.graphml"
+        kg.export_graphml(str(kg_file))
+        click.echo(f"Knowledge graph exported to: {kg_file}")
+
+    click.echo("✅ Processing complete!")
+
+
 @cli.command()
 @click.argument('text')
 def extract_entities(text):
     """Extract entities from text."""
-    entity_recognizer = EMSEntityRecognizer()
+    entity_recognizer = _get_recognizer(lazy=True)
     entities = entity_recognizer.extract_entities(text)
 
     click.echo(f"Entities found in text: {len(entities)}")
@@ -109,7 +217,7 @@ def extract_entities(text):
 @click.argument('text')
 def extract_rules(text):
     """Extract rules from text."""
-    rule_extractor = RuleExtractor()
+    rule_extractor = _get_rule_extractor()
     rules = rule_extractor.extract_rules(text, "cli_input")
 
     click.echo(f"Rules found in text: {len(rules)}")
@@ -126,6 +234,8 @@ def extract_rules(text):
 @click.option('--debug', is_flag=True, help='Enable debug mode')
 def serve(host, port, debug):
     """Start the API server."""
+    from .api import app
+
     click.echo(f"Starting EMS Doctrine Prototype API on {host}:{port}")
     app.run(host=host, port=port, debug=debug)
 
@@ -151,7 +261,7 @@ def demo():
 
     # Extract entities
     click.echo("🔍 Extracting entities...")
-    entity_recognizer = EMSEntityRecognizer()
+    entity_recognizer = _get_recognizer()
     entities = entity_recognizer.extract_entities(sample_text)
 
     for entity in entities:
@@ -160,7 +270,7 @@ def demo():
 
     # Extract rules
     click.echo("📋 Extracting rules...")
-    rule_extractor = RuleExtractor()
+    rule_extractor = _get_rule_extractor()
     rules = rule_extractor.extract_rules(sample_text, "demo")
 
     for rule in rules:
@@ -181,7 +291,7 @@ def demo():
 
     # Knowledge graph
     click.echo("🕸️  Building knowledge graph...")
-    kg = KnowledgeGraph()
+    kg = _get_knowledge_graph()
     kg.add_entities_from_document(entities, "demo")
 
     stats = kg.get_statistics()
@@ -204,7 +314,7 @@ def init():
     Path("logs").mkdir(exist_ok=True)
 
     # Initialize knowledge graph database
-    kg = KnowledgeGraph()
+    kg = _get_knowledge_graph()
     click.echo("✅ Knowledge graph database initialized")
 
     # Check if sample data exists
@@ -4,8 +4,9 @@ Configuration management for EMS Doctrine Prototype
 
 import os
 import yaml
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, FrozenSet
 
 
 class Config:
@@ -68,7 +69,7 @@ class Config:
         """Get project version."""
         return self.get('project.version', '0.1.0')
 
-    @property
+    @cached_property
     def spacy_model(self) -> str:
         """Get spaCy model name."""
         return self.get('nlp.spacy_model', 'en_core_web_sm')
@@ -78,27 +79,27 @@ class Config:
         """Get database path."""
         return self.get('knowledge_graph.database_path', 'data/processed/ems_knowledge.db')
 
-    @property
+    @cached_property
     def frequency_bands(self) -> Dict[str, str]:
         """Get EMS frequency band definitions."""
         return self.get('ems_domain.frequency_bands', {})
 
-    @property
-    def equipment_types(self) -> list:
+    @cached_property
+    def equipment_types(self) -> FrozenSet[str]:
         """Get EMS equipment types."""
-        return self.get('ems_domain.equipment_types', [])
+        return frozenset(self.get('ems_domain.equipment_types', []))
 
-    @property
-    def operation_types(self) -> list:
+    @cached_property
+    def operation_types(self) -> FrozenSet[str]:
         """Get EMS operation types."""
-        return self.get('ems_domain.operation_types', [])
+        return frozenset(self.get('ems_domain.operation_types', []))
 
-    @property
-    def authorities(self) -> list:
+    @cached_property
+    def authorities(self) -> FrozenSet[str]:
         """Get EMS authorities."""
-        return self.get('ems_domain.authorities', [])
+        return frozenset(self.get('ems_domain.authorities', []))
 
-    @property
+    @cached_property
     def deontic_keywords(self) -> Dict[str, list]:
         """Get deontic logic keywords."""
         return self.get('rule_extraction.deontic_keywords', {})
@@ -2,18 +2,54 @@
 Document processing pipeline for extracting text from PDF files and other formats.
 """
 
+import io
 import re
 import logging
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import fitz  # PyMuPDF
-import pdfplumber
 from dataclasses import dataclass
 
 from .config import config
 
 
-@dataclass
+# Section headings, tried in order; the name of the matching group gives the level
+_SECTION_RE = re.compile(
+    r'^(?P<l1>\d+\.?\s+[A-Z][A-Z\s]+)$'              # "1. INTRODUCTION"
+    r'|^(?P<l2>\d+\.\d+\.?\s+[A-Z][A-Z\s]+)$'        # "1.1. OVERVIEW"
+    r'|^(?P<l3>\d+\.\d+\.\d+\.?\s+[A-Z][A-Z\s]+)$'  # "1.1.1. PURPOSE"
+    r'|^(?P<caps>[A-Z][A-Z\s]+)$'                     # "CHAPTER 1"
+)
+_SECTION_LEVELS = {'l1': 1, 'l2': 2, 'l3': 3, 'caps': 1}
+
+# Plain text extraction flags: ligatures are expanded to their letters so
+# regex and phrase matching see ordinary text, and no image info is kept
+_PDF_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Keywords that indicate EMS-related sections, matched anywhere in a section
+_EMS_KEYWORDS_RE = re.compile('|'.join(re.escape(keyword) for keyword in (
+    'electromagnetic',
+    'spectrum',
+    'frequency',
+    'jamming',
+    'electronic warfare',
+    'ems',
+    'electronic attack',
+    'electronic protection',
+    'sead',
+)), re.IGNORECASE)
+
+# Publication identifiers looked for near the start of a document
+_PUB_PATTERNS = (
+    (re.compile(r'AFDP\s+(\d+[-\d]*)'), 'afdp_number'),
+    (re.compile(r'AFTTP\s+(\d+[-\d]*)'), 'afttp_number'),
+    (re.compile(r'JP\s+(\d+[-\d]*)'), 'jp_number'),
+    (re.compile(r'(\d{1,2}\s+\w+\s+\d{4})'), 'publication_date'),  # "15 April 2021"
+)
+
+
+@dataclass(slots=True)
 class Document:
     """Represents a processed document."""
     filename: str
@@ -23,7 +59,7 @@ class Document:
     metadata: Dict[str, str]
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentSection:
     """Represents a section of a document."""
     title: str
@@ -78,16 +114,8 @@ class DocumentProcessor:
         self.logger.info(f"Processing PDF: {file_path}")
 
         try:
-            doc = fitz.open(file_path)
-            full_text = ""
-            sections = []
-
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                full_text += text + "\n"
-
-            doc.close()
+            # Join once instead of growing a string page by page
+            full_text = "".join(text + "\n" for text in self.iter_pages(file_path))
 
             # Extract sections from the text
             sections = self._extract_sections(full_text)
@@ -107,6 +135,20 @@ class DocumentProcessor:
             self.logger.error(f"Error processing PDF {file_path}: {e}")
             raise
 
+    def iter_pages(self, file_path: Path) -> Iterator[str]:
+        """
+        Yield the text of a PDF one page at a time.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Yields:
+            Text of each page, in order
+        """
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                yield page.get_text("text", flags=_PDF_TEXT_FLAGS)
+
     def _extract_sections(self, text: str) -> List[DocumentSection]:
         """
         Extract sections from document text using pattern matching.
@@ -119,54 +161,48 @@ class DocumentProcessor:
         """
         sections = []
 
-        # Patterns for different section types
-        patterns = [
-            # Chapter/Section patterns for military doctrine
-            (r'^(\d+\.?\s+[A-Z][A-Z\s]+)$', 1),  # "1. INTRODUCTION"
-            (r'^(\d+\.\d+\.?\s+[A-Z][A-Z\s]+)$', 2),  # "1.1. OVERVIEW"
-            (r'^(\d+\.\d+\.\d+\.?\s+[A-Z][A-Z\s]+)$', 3),  # "1.1.1. PURPOSE"
-            (r'^([A-Z][A-Z\s]+)$', 1),  # "CHAPTER 1"
-        ]
-
-        lines = text.split('\n')
         current_section = None
         current_content = []
 
-        for i, line in enumerate(lines):
+        # Iterate lines lazily rather than materializing text.split('\n')
+        for i, line in enumerate(io.StringIO(text)):
             line = line.strip()
 
             if not line:
                 continue
 
-            # Check if line matches any section pattern
-            for pattern, level in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    # Save previous section if exists
-                    if current_section:
-                        sections.append(DocumentSection(
-                            title=current_section,
-                            content='\n'.join(current_content).strip(),
-                            level=level,
-                            page_number=i // 50  # Rough page estimation
-                        ))
-
-                    # Start new section
-                    current_section = match.group(1).strip()
-                    current_content = []
-                    break
-            else:
-                # Add line to current section content
+            # Check if line is a section heading; every heading starts with a
+            # digit or a capital letter, so other lines skip the regex
+            first = line[0]
+            match = _SECTION_RE.match(line) if first.isdigit() or 'A' <= first <= 'Z' else None
+            if match:
+                level = _SECTION_LEVELS[match.lastgroup]
+
+                # Save previous section if exists
                 if current_section:
-                    current_content.append(line)
+                    sections.append(DocumentSection(
+                        title=current_section,
+                        content='\n'.join(current_content),
+                        level=level,
+                        page_number=i // 50  # Rough page estimation
+                    ))
+
+                # Start new section
+                current_section = match.group(match.lastgroup).strip()
+                current_content = []
+            elif current_section:
+                # Add line to current section content; lines are already
+                # stripped and non-blank, so the joined content needs no strip
+                current_content.append(line)
 
         # Add final section
         if current_section:
+            line_count = text.count('\n') + 1
             sections.append(DocumentSection(
                 title=current_section,
-                content='\n'.join(current_content).strip(),
+                content='\n'.join(current_content),
                 level=1,
-                page_number=len(lines) // 50
+                page_number=line_count // 50
             ))
 
         self.logger.info(f"Extracted {len(sections)} sections")
@@ -189,31 +225,43 @@ class DocumentProcessor:
             'character_count': len(text)
         }
 
-        # Try to extract title from first few lines
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        if lines:
+        # Try to extract title from first few lines, reading only as many
+        # lines as it takes to find ten non-blank ones
+        stripped = (line.strip() for line in io.StringIO(text))
+        for line in islice(filter(None, stripped), 10):
             # Look for all-caps title in first few lines
-            for line in lines[:10]:
-                if line.isupper() and len(line) > 10:
-                    metadata['title'] = line
-                    break
+            if line.isupper() and len(line) > 10:
+                metadata['title'] = line
+                break
 
         # Extract publication information
-        pub_patterns = [
-            (r'AFDP\s+(\d+[-\d]*)', 'afdp_number'),
-            (r'AFTTP\s+(\d+[-\d]*)', 'afttp_number'),
-            (r'JP\s+(\d+[-\d]*)', 'jp_number'),
-            (r'(\d{1,2}\s+\w+\s+\d{4})', 'publication_date'),  # "15 April 2021"
-        ]
-
         text_sample = text[:2000]  # Check first 2000 characters
-        for pattern, key in pub_patterns:
-            match = re.search(pattern, text_sample)
+        for pattern, key in _PUB_PATTERNS:
+            match = pattern.search(text_sample)
             if match:
                 metadata[key] = match.group(1)
 
         return metadata
 
+    def split_paragraphs(self, text: str) -> Tuple[List[str], List[int]]:
+        """
+        Split text into blank-line separated paragraphs.
+
+        Args:
+            text: Full document text
+
+        Returns:
+            Tuple of (paragraph texts, character offset of each paragraph in text)
+        """
+        paragraphs = []
+        offsets = []
+
+        for match in re.finditer(r'\S.*?(?=\n\s*\n|\Z)', text, re.DOTALL):
+            paragraphs.append(match.group(0))
+            offsets.append(match.start())
+
+        return paragraphs, offsets
+
     def extract_ems_content(self, document: Document) -> Dict[str, str]:
         """
         Extract EMS-specific content from a document.
@@ -226,26 +274,9 @@ class DocumentProcessor:
         """
         ems_content = {}
 
-        # Keywords that indicate EMS-related sections
-        ems_keywords = [
-            'electromagnetic',
-            'spectrum',
-            'frequency',
-            'jamming',
-            'electronic warfare',
-            'ems',
-            'electronic attack',
-            'electronic protection',
-            'sead'
-        ]
-
         for section in document.sections:
-            section_title = section['title'].lower()
-            section_content = section['content'].lower()
-
             # Check if section contains EMS content
-            if any(keyword in section_title or keyword in section_content
-                   for keyword in ems_keywords):
+            if _EMS_KEYWORDS_RE.search(section['title']) or _EMS_KEYWORDS_RE.search(section['content']):
                 ems_content[section['title']] = section['content']
 
         self.logger.info(f"Extracted {len(ems_content)} EMS-related sections")
@@ -2,18 +2,123 @@
 Entity recognition system for extracting EMS-specific entities from doctrine text.
 """
 
+import os
 import re
+import sys
 import logging
-from typing import List, Dict, Set, Tuple
+from collections import Counter
+from typing import Iterable, Iterator, List, Dict, Set, Tuple, Optional
 import spacy
-from spacy.matcher import Matcher
+from spacy.matcher import Matcher, PhraseMatcher
 from spacy.lang.en import English
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from .config import config
 
-
-@dataclass
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Entity count above which deduplication runs on the compiled sweep; below
+# it, building the arrays costs more than the Python loop
+NUMBA_DEDUP_THRESHOLD = 5000
+
+# Text count from which extract_entities_bulk tokenizes in worker processes;
+# below it, starting the workers costs more than it saves
+BULK_MULTIPROCESS_THRESHOLD = 1000
+
+
+# Frequency values and ranges with units, e.g. "225 MHz" or "30-88 MHz"
+_FREQ_RE = re.compile(
+    r'(?P<lo>\d+(?:\.\d+)?)(?:\s*[-–—]\s*(?P<hi>\d+(?:\.\d+)?))?'
+    r'\s*(?P<unit>MHz|GHz|KHz|Hz|mhz|ghz|khz|hz)\b'
+)
+
+# Common military EMS acronyms and terms
+MILITARY_TERMS = {
+    'EA': 'ELECTRONIC_ATTACK',
+    'EP': 'ELECTRONIC_PROTECTION',
+    'ES': 'ELECTRONIC_SUPPORT',
+    'EW': 'ELECTRONIC_WARFARE',
+    'SEAD': 'EMS_OPERATION',
+    'DEAD': 'EMS_OPERATION',
+    'ECM': 'EMS_EQUIPMENT',
+    'ECCM': 'EMS_EQUIPMENT',
+    'ESM': 'EMS_EQUIPMENT',
+    'ELINT': 'EMS_OPERATION',
+    'COMINT': 'EMS_OPERATION',
+    'SIGINT': 'EMS_OPERATION'
+}
+
+# Exactly the known acronyms, as whole words
+_MIL_RE = re.compile(r'\b(' + '|'.join(map(re.escape, sorted(MILITARY_TERMS, key=len, reverse=True))) + r')\b')
+
+# Common relationship patterns, matched case-insensitively
+_RELATIONSHIP_PATTERNS = [
+    # "X operates on Y frequency"
+    (re.compile(r'(\w+)\s+operates?\s+on\s+(\d+(?:\.\d+)?\s*(?:MHz|GHz|KHz|Hz))', re.IGNORECASE), 'OPERATES_ON'),
+
+    # "X jams Y"
+    (re.compile(r'(\w+)\s+jams?\s+(\w+)', re.IGNORECASE), 'JAMS'),
+
+    # "X coordinates Y"
+    (re.compile(r'(\w+)\s+coordinates?\s+(\w+)', re.IGNORECASE), 'COORDINATES'),
+
+    # "X controls Y"
+    (re.compile(r'(\w+)\s+controls?\s+(\w+)', re.IGNORECASE), 'CONTROLS'),
+]
+
+
+# Regex equivalents of the token patterns in _setup_ems_patterns, used by the
+# lazy (spaCy-free) mode. Words are joined by a single space, as consecutive
+# tokens are in spaCy's Doc, and \b stands in for token boundaries.
+_UNIT = r'(?:mhz|ghz|khz|hz)'
+# spaCy keeps a hyphen inside a token only between a letter and a digit
+# ("PRC-117"); "30-88" and "3.5-ghz" are split around it. Trailing periods
+# and commas are split off as suffixes, so a number token ends in a letter
+# or digit.
+_TOKEN_CHAR = r'(?:[\w.,]|(?<=[^\W\d])-(?=\d))'
+_NUMBER_TOKEN = rf'(?<![^\s(\[{{"\'/-]){_TOKEN_CHAR}*\d(?:{_TOKEN_CHAR}*[^\W_])?'
+_LAZY_PATTERNS = [
+    (re.compile(rf'(?:{_NUMBER_TOKEN} )?\b{_UNIT}\b', re.IGNORECASE), 'FREQUENCY'),
+    (re.compile(rf'{_NUMBER_TOKEN} ?- ?{_NUMBER_TOKEN} {_UNIT}\b', re.IGNORECASE), 'FREQUENCY'),
+    (re.compile(r'\b(?:hf|vhf|uhf|shf|ehf)\b', re.IGNORECASE), 'FREQUENCY'),
+    (re.compile(r'\b(?:(?:jammers?|jamming|antennas?)(?: system)?|radars?|radios?|transmitters?|receivers?)\b',
+                re.IGNORECASE), 'EMS_EQUIPMENT'),
+    (re.compile(r'\b(?:electronic (?:attack|warfare|protection)|spectrum management|sead|electromagnetic warfare)\b',
+                re.IGNORECASE), 'EMS_OPERATION'),
+    (re.compile(r'\b(?:JFACC|JFC|JEMSO|EWO)\b'), 'AUTHORITY'),
+    (re.compile(r'\b(?:spectrum manager|electronic warfare officer)\b', re.IGNORECASE), 'AUTHORITY'),
+]
+
+
+def _sweep_spans(starts, ends):
+    """
+    Indices of the spans kept by the overlap sweep in ``_deduplicate_entities``.
+
+    Spans must be sorted by start, longest first among equal starts.
+    """
+    kept = np.empty(len(starts), dtype=np.int64)
+    count = 0
+    for i in range(len(starts)):
+        if count and starts[i] < ends[kept[count - 1]]:
+            last = kept[count - 1]
+            if ends[i] - starts[i] > ends[last] - starts[last]:
+                kept[count - 1] = i
+        else:
+            kept[count] = i
+            count += 1
+    return kept[:count]
+
+
+if njit is not None:
+    _sweep_spans = njit(cache=True)(_sweep_spans)
+
+
+@dataclass(slots=True)
 class Entity:
     """Represents a recognized entity."""
     text: str
@@ -21,34 +126,75 @@ class Entity:
     start: int
     end: int
     confidence: float = 1.0
-    context: str = ""
+    # The context is kept as offsets into the analysed text and only sliced
+    # out when read, so extraction does not copy a substring per entity
+    source: str = field(default="", repr=False, compare=False)
+    context_start: int = 0
+    context_end: int = 0
+
+    @property
+    def context(self) -> str:
+        """Text surrounding the entity."""
+        return self.source[self.context_start:self.context_end]
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Entities, per-label counts and relationships found in one text."""
+    entities: List[Entity]
+    stats: Dict[str, int]
+    relationships: List[Dict]
 
 
 class EMSEntityRecognizer:
     """Recognizes EMS-specific entities in doctrine text."""
 
-    def __init__(self):
-        """Initialize the entity recognizer."""
+    def __init__(self, lazy: bool = False):
+        """
+        Initialize the entity recognizer.
+
+        Args:
+            lazy: Match with compiled regexes only and defer loading spaCy
+                until ``extract_entities_spacy`` is called
+        """
         self.logger = logging.getLogger(__name__)
+        self.lazy = lazy
 
-        # Load spaCy model
+        # Load domain knowledge
+        self.frequency_bands = config.frequency_bands
+        self.equipment_types = config.equipment_types
+        self.operation_types = config.operation_types
+        self.authorities = config.authorities
+
+        self.nlp = None
+        if lazy:
+            self._lazy_patterns = _LAZY_PATTERNS + self._dictionary_regexes()
+        else:
+            self._load_pipeline()
+
+    def _load_pipeline(self):
+        """Load spaCy and build the token and phrase matchers."""
+        # Load spaCy model. Matching only uses token text, so only the
+        # tokenizer and vocab are loaded; none of the trained components
+        # (tagger, parser, NER, ...) feed into it.
         try:
-            self.nlp = spacy.load(config.spacy_model)
+            self.nlp = spacy.load(config.spacy_model, exclude=[
+                "tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"
+            ])
         except OSError:
             self.logger.warning(f"spaCy model {config.spacy_model} not found. Using basic English model.")
             self.nlp = English()
 
-        # Initialize matcher
+        # Token patterns (numbers, units) go to the Matcher; fixed phrases are
+        # matched in a single pass over the token hashes by PhraseMatchers,
+        # case-insensitively or, for acronyms, on the exact text
         self.matcher = Matcher(self.nlp.vocab)
+        self.phrase_matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+        self.orth_phrase_matcher = PhraseMatcher(self.nlp.vocab, attr="ORTH")
 
         # Set up domain-specific patterns
         self._setup_ems_patterns()
-
-        # Load domain knowledge
-        self.frequency_bands = config.frequency_bands
-        self.equipment_types = set(config.equipment_types)
-        self.operation_types = set(config.operation_types)
-        self.authorities = set(config.authorities)
+        self._setup_dictionary_patterns()
 
     def _setup_ems_patterns(self):
         """Set up pattern matching for EMS entities."""
@@ -60,37 +206,57 @@ class EMSEntityRecognizer:
             [{"LOWER": {"IN": ["hf", "vhf", "uhf", "shf", "ehf"]}}],
         ]
 
-        # Equipment patterns
-        equipment_patterns = [
-            [{"LOWER": {"IN": ["jammer", "jammers", "jamming"]}}, {"LOWER": "system", "OP": "?"}],
-            [{"LOWER": {"IN": ["radar", "radars"]}}],
-            [{"LOWER": {"IN": ["radio", "radios"]}}],
-            [{"LOWER": {"IN": ["antenna", "antennas"]}}, {"LOWER": "system", "OP": "?"}],
-            [{"LOWER": {"IN": ["transmitter", "transmitters"]}}],
-            [{"LOWER": {"IN": ["receiver", "receivers"]}}],
+        # Equipment phrases ("system" is optional after jammers and antennas)
+        equipment_phrases = [
+            word + suffix
+            for word in ["jammer", "jammers", "jamming", "antenna", "antennas"]
+            for suffix in ["", " system"]
+        ] + ["radar", "radars", "radio", "radios", "transmitter", "transmitters", "receiver", "receivers"]
+
+        # Operation phrases
+        operation_phrases = [
+            "electronic attack", "electronic warfare", "electronic protection",
+            "spectrum management",
+            "sead",  # Suppression of Enemy Air Defenses
+            "electromagnetic warfare",
         ]
 
-        # Operation patterns
-        operation_patterns = [
-            [{"LOWER": "electronic"}, {"LOWER": {"IN": ["attack", "warfare", "protection"]}}],
-            [{"LOWER": "spectrum"}, {"LOWER": "management"}],
-            [{"LOWER": "sead"}],  # Suppression of Enemy Air Defenses
-            [{"LOWER": "electromagnetic"}, {"LOWER": "warfare"}],
-        ]
-
-        # Authority patterns
-        authority_patterns = [
-            [{"TEXT": {"IN": ["JFACC", "JFC", "JEMSO"]}}],
-            [{"LOWER": "spectrum"}, {"LOWER": "manager"}],
-            [{"LOWER": "electronic"}, {"LOWER": "warfare"}, {"LOWER": "officer"}],
-            [{"TEXT": "EWO"}],
-        ]
+        # Authority phrases; the acronyms are matched case-sensitively
+        authority_phrases = ["spectrum manager", "electronic warfare officer"]
+        authority_acronyms = ["JFACC", "JFC", "JEMSO", "EWO"]
 
-        # Add patterns to matcher
+        # Add patterns to matchers
         self.matcher.add("FREQUENCY", frequency_patterns)
-        self.matcher.add("EMS_EQUIPMENT", equipment_patterns)
-        self.matcher.add("EMS_OPERATION", operation_patterns)
-        self.matcher.add("AUTHORITY", authority_patterns)
+        self.phrase_matcher.add("EMS_EQUIPMENT", list(self.nlp.tokenizer.pipe(equipment_phrases)))
+        self.phrase_matcher.add("EMS_OPERATION", list(self.nlp.tokenizer.pipe(operation_phrases)))
+        self.phrase_matcher.add("AUTHORITY", list(self.nlp.tokenizer.pipe(authority_phrases)))
+        self.orth_phrase_matcher.add("AUTHORITY", list(self.nlp.tokenizer.pipe(authority_acronyms)))
+
+    def _dictionary_phrases(self) -> Dict[str, List[str]]:
+        """Get the configured EMS domain terms as phrases, by entity label."""
+        dictionaries = {
+            "EMS_EQUIPMENT": self.equipment_types,
+            "EMS_OPERATION": self.operation_types,
+            "AUTHORITY": self.authorities,
+        }
+
+        # Config terms use underscores for multi-word phrases
+        return {label: sorted(term.replace('_', ' ') for term in terms)
+                for label, terms in dictionaries.items() if terms}
+
+    def _setup_dictionary_patterns(self):
+        """Add the configured EMS domain terms to the phrase matcher."""
+        for label, phrases in self._dictionary_phrases().items():
+            self.phrase_matcher.add(label, list(self.nlp.tokenizer.pipe(phrases)))
+
+    def _dictionary_regexes(self) -> List[Tuple[re.Pattern, str]]:
+        """Compile the configured EMS domain terms into one regex per label."""
+        regexes = []
+        for label, phrases in self._dictionary_phrases().items():
+            # Longest first, so the alternation prefers the longest phrase
+            alternation = '|'.join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+            regexes.append((re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE), label))
+        return regexes
 
     def extract_entities(self, text: str) -> List[Entity]:
         """
@@ -102,32 +268,147 @@ class EMSEntityRecognizer:
         Returns:
             List of recognized entities
         """
-        entities = []
+        if self.lazy:
+            entities = self._extract_entities_regex(text)
+        else:
+            entities = self.extract_entities_spacy(text)
+
+        self.logger.info(f"Extracted {len(entities)} entities from text")
+        return entities
 
-        # Process text with spaCy
-        doc = self.nlp(text)
+    def extract_entities_spacy(self, text: str) -> List[Entity]:
+        """
+        Extract EMS entities from text with the spaCy matchers.
+
+        In lazy mode this loads spaCy on first use.
+
+        Args:
+            text: Input text to analyze
+
+        Returns:
+            List of recognized entities
+        """
+        if self.nlp is None:
+            self._load_pipeline()
+
+        # Tokenize only; the patterns match on TEXT/LOWER, not on tags or parses
+        doc = self.nlp.make_doc(text)
+        return self._extract_entities_from_doc(doc, text)
+
+    def extract_entities_batch(self, texts: List[str],
+                               offsets: Optional[List[int]] = None) -> List[List[Entity]]:
+        """
+        Extract EMS entities from several texts in one batched spaCy pass.
+
+        The batch size is read from the ``EMS_SPACY_BATCH_SIZE`` environment
+        variable (default 64).
+
+        Args:
+            texts: Input texts to analyze
+            offsets: Optional character offset of each text within a larger
+                document; entity positions are shifted by it
+
+        Returns:
+            List of entity lists, one per input text
+        """
+        if self.lazy:
+            batches = (self._extract_entities_regex(text) for text in texts)
+        else:
+            batch_size = int(os.getenv("EMS_SPACY_BATCH_SIZE", "64"))
+            docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=1,
+                                 disable=self.nlp.pipe_names)
+            batches = (self._extract_entities_from_doc(doc, text) for doc, text in zip(docs, texts))
+
+        results = []
+        for i, entities in enumerate(batches):
+            if offsets:
+                for entity in entities:
+                    entity.start += offsets[i]
+                    entity.end += offsets[i]
+            results.append(entities)
+
+        self.logger.info(f"Extracted {sum(len(r) for r in results)} entities from {len(texts)} texts")
+        return results
+
+    def extract_entities_bulk(self, texts: Iterable[str], n_process: int = -1,
+                              batch_size: int = 50) -> Iterator[Tuple[int, List[Entity]]]:
+        """
+        Extract EMS entities from a large collection of texts.
+
+        Texts are tokenized by ``n_process`` worker processes (-1 for one per
+        CPU) once there are at least ``BULK_MULTIPROCESS_THRESHOLD`` of them;
+        smaller collections are tokenized in this process. Matching always
+        runs here. Callers that may use worker processes must be guarded by
+        ``if __name__ == "__main__":`` on platforms that spawn them.
+
+        Args:
+            texts: Input texts to analyze
+            n_process: Number of worker processes for large collections
+            batch_size: Number of texts sent to a worker at a time
+
+        Yields:
+            (index of the text, entities) pairs in input order
+        """
+        texts = list(texts)
+        if self.lazy:
+            yield from enumerate(map(self._extract_entities_regex, texts))
+            return
+
+        if len(texts) < BULK_MULTIPROCESS_THRESHOLD:
+            n_process = 1
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process,
+                             disable=self.nlp.pipe_names)
+        for i, doc in enumerate(docs):
+            yield i, self._extract_entities_from_doc(doc, texts[i])
+
+    def _extract_entities_from_doc(self, doc, text: str) -> List[Entity]:
+        """Extract entities from an already tokenized Doc of ``text``."""
+        entities = []
 
         # Extract entities using pattern matching
-        matches = self.matcher(doc)
+        matches = self.matcher(doc) + self.phrase_matcher(doc) + self.orth_phrase_matcher(doc)
 
         for match_id, start, end in matches:
             span = doc[start:end]
-            label = self.nlp.vocab.strings[match_id]
+            label = sys.intern(self.nlp.vocab.strings[match_id])
 
             # Get context (surrounding words)
-            context_start = max(0, start - 5)
-            context_end = min(len(doc), end + 5)
-            context = doc[context_start:context_end].text
+            window = doc[max(0, start - 5):min(len(doc), end + 5)]
 
             entity = Entity(
                 text=span.text,
                 label=label,
                 start=span.start_char,
                 end=span.end_char,
-                context=context
+                source=text,
+                context_start=window.start_char,
+                context_end=window.end_char
             )
             entities.append(entity)
 
+        return self._merge_regex_entities(entities, text)
+
+    def _extract_entities_regex(self, text: str) -> List[Entity]:
+        """Extract entities with compiled regexes only (lazy mode)."""
+        entities = []
+
+        for pattern, label in self._lazy_patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                entities.append(Entity(
+                    text=match.group(0),
+                    label=label,
+                    start=start,
+                    end=end,
+                    source=text,
+                    context_start=max(0, start-20),
+                    context_end=end+20
+                ))
+
+        return self._merge_regex_entities(entities, text)
+
+    def _merge_regex_entities(self, entities: List[Entity], text: str) -> List[Entity]:
+        """Add frequency and military entities, then deduplicate and sort by position."""
         # Extract specific frequency values
         freq_entities = self._extract_frequency_values(text)
         entities.extend(freq_entities)
@@ -140,42 +421,24 @@ class EMSEntityRecognizer:
         entities = self._deduplicate_entities(entities)
         entities.sort(key=lambda e: e.start)
 
-        self.logger.info(f"Extracted {len(entities)} entities from text")
         return entities
 
     def _extract_frequency_values(self, text: str) -> List[Entity]:
         """Extract specific frequency values and ranges."""
         entities = []
 
-        # Pattern for frequency values with units
-        freq_pattern = r'(\d+(?:\.\d+)?)\s*(MHz|GHz|KHz|Hz|mhz|ghz|khz|hz)\b'
-
-        for match in re.finditer(freq_pattern, text):
-            start, end = match.span()
-            frequency_text = match.group(0)
-
-            entity = Entity(
-                text=frequency_text,
-                label="FREQUENCY",
-                start=start,
-                end=end,
-                context=text[max(0, start-20):end+20]
-            )
-            entities.append(entity)
-
-        # Pattern for frequency ranges
-        range_pattern = r'(\d+(?:\.\d+)?)\s*[-–—]\s*(\d+(?:\.\d+)?)\s*(MHz|GHz|KHz|Hz|mhz|ghz|khz|hz)\b'
-
-        for match in re.finditer(range_pattern, text):
+        # One pass finds both forms; a range is a match with the upper bound set
+        for match in _FREQ_RE.finditer(text):
             start, end = match.span()
-            range_text = match.group(0)
 
             entity = Entity(
-                text=range_text,
-                label="FREQUENCY_RANGE",
+                text=match.group(0),
+                label="FREQUENCY" if match.group('hi') is None else "FREQUENCY_RANGE",
                 start=start,
                 end=end,
-                context=text[max(0, start-20):end+20]
+                source=text,
+                context_start=max(0, start-20),
+                context_end=end+20
             )
             entities.append(entity)
 
@@ -185,38 +448,20 @@ class EMSEntityRecognizer:
         """Extract military-specific entities and acronyms."""
         entities = []
 
-        # Common military EMS acronyms and terms
-        military_terms = {
-            'EA': 'ELECTRONIC_ATTACK',
-            'EP': 'ELECTRONIC_PROTECTION',
-            'ES': 'ELECTRONIC_SUPPORT',
-            'EW': 'ELECTRONIC_WARFARE',
-            'SEAD': 'EMS_OPERATION',
-            'DEAD': 'EMS_OPERATION',
-            'ECM': 'EMS_EQUIPMENT',
-            'ECCM': 'EMS_EQUIPMENT',
-            'ESM': 'EMS_EQUIPMENT',
-            'ELINT': 'EMS_OPERATION',
-            'COMINT': 'EMS_OPERATION',
-            'SIGINT': 'EMS_OPERATION'
-        }
-
-        # Pattern for military acronyms (2-6 uppercase letters)
-        acronym_pattern = r'\b([A-Z]{2,6})\b'
-
-        for match in re.finditer(acronym_pattern, text):
+        for match in _MIL_RE.finditer(text):
             acronym = match.group(1)
-            if acronym in military_terms:
-                start, end = match.span()
+            start, end = match.span()
 
-                entity = Entity(
-                    text=acronym,
-                    label=military_terms[acronym],
-                    start=start,
-                    end=end,
-                    context=text[max(0, start-20):end+20]
-                )
-                entities.append(entity)
+            entity = Entity(
+                text=acronym,
+                label=MILITARY_TERMS[acronym],
+                start=start,
+                end=end,
+                source=text,
+                context_start=max(0, start-20),
+                context_end=end+20
+            )
+            entities.append(entity)
 
         return entities
 
@@ -225,39 +470,60 @@ class EMSEntityRecognizer:
         if not entities:
             return entities
 
-        # Sort by start position
-        sorted_entities = sorted(entities, key=lambda e: e.start)
+        # Sort by start position, longest first among equal starts
+        sorted_entities = sorted(entities, key=lambda e: (e.start, e.start - e.end))
+
+        if njit is not None and len(sorted_entities) >= NUMBA_DEDUP_THRESHOLD:
+            starts = np.fromiter((e.start for e in sorted_entities), dtype=np.int64, count=len(sorted_entities))
+            ends = np.fromiter((e.end for e in sorted_entities), dtype=np.int64, count=len(sorted_entities))
+            return [sorted_entities[i] for i in _sweep_spans(starts, ends)]
 
+        # Kept spans never overlap and every later entity starts at or after
+        # them, so only the most recently kept span can overlap the next one
         deduplicated = []
         for entity in sorted_entities:
-            # Check for overlap with existing entities
-            overlap = False
-            for existing in deduplicated:
-                if (entity.start < existing.end and entity.end > existing.start):
-                    # Overlapping entities - keep the longer one or the one with higher confidence
-                    if (entity.end - entity.start) > (existing.end - existing.start):
-                        deduplicated.remove(existing)
-                        deduplicated.append(entity)
-                    overlap = True
-                    break
-
-            if not overlap:
+            if deduplicated and entity.start < deduplicated[-1].end:
+                # Overlapping entities - keep the longer one
+                last = deduplicated[-1]
+                if (entity.end - entity.start) > (last.end - last.start):
+                    deduplicated[-1] = entity
+            else:
                 deduplicated.append(entity)
 
         return deduplicated
 
     def get_entity_statistics(self, entities: List[Entity]) -> Dict[str, int]:
         """Get statistics about extracted entities."""
-        stats = {}
+        return dict(Counter(entity.label for entity in entities))
 
-        for entity in entities:
-            label = entity.label
-            if label in stats:
-                stats[label] += 1
-            else:
-                stats[label] = 1
+    def analyze(self, text: str, paragraphs: Optional[List[str]] = None,
+                offsets: Optional[List[int]] = None) -> AnalysisResult:
+        """
+        Extract entities, their statistics and relationships in one call.
+
+        Labels are counted while the entity batches are collected, and
+        relationships come from the raw text, so nothing is tokenized twice.
 
-        return stats
+        Args:
+            text: Full text to analyze
+            paragraphs: Optional split of ``text`` to extract entities from
+                in batches, as returned by ``DocumentProcessor.split_paragraphs``
+            offsets: Character offset of each paragraph within ``text``
+
+        Returns:
+            AnalysisResult with entities, per-label counts and relationships
+        """
+        batches = (self.extract_entities_batch(paragraphs, offsets) if paragraphs is not None
+                   else [self.extract_entities(text)])
+
+        entities = []
+        stats = Counter()
+        for batch in batches:
+            entities.extend(batch)
+            stats.update(entity.label for entity in batch)
+
+        relationships = self.extract_relationships(text, entities)
+        return AnalysisResult(entities=entities, stats=dict(stats), relationships=relationships)
 
     def extract_relationships(self, text: str, entities: List[Entity]) -> List[Dict]:
         """
@@ -270,26 +536,11 @@ class EMSEntityRecognizer:
         Returns:
             List of relationship dictionaries
         """
+        # Relationships come from regexes over the raw text; no spaCy parse needed
         relationships = []
-        doc = self.nlp(text)
-
-        # Look for common relationship patterns
-        relationship_patterns = [
-            # "X operates on Y frequency"
-            (r'(\w+)\s+operates?\s+on\s+(\d+(?:\.\d+)?\s*(?:MHz|GHz|KHz|Hz))', 'OPERATES_ON'),
-
-            # "X jams Y"
-            (r'(\w+)\s+jams?\s+(\w+)', 'JAMS'),
-
-            # "X coordinates Y"
-            (r'(\w+)\s+coordinates?\s+(\w+)', 'COORDINATES'),
-
-            # "X controls Y"
-            (r'(\w+)\s+controls?\s+(\w+)', 'CONTROLS'),
-        ]
 
-        for pattern, relation_type in relationship_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
+        for pattern, relation_type in _RELATIONSHIP_PATTERNS:
+            for match in pattern.finditer(text):
                 subject = match.group(1)
                 object_text = match.group(2)
 
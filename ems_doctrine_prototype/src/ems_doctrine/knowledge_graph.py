@@ -3,19 +3,168 @@ Knowledge graph storage and management system for EMS doctrine.
 Uses SQLite for persistence and NetworkX for graph operations.
 """
 
+import copy
 import json
 import logging
+import queue
 import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import groupby, islice
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
 import networkx as nx
 from dataclasses import dataclass, asdict
 
 from .config import config
 from .entity_recognition import Entity
 
+try:
+    # C-backed JSON codec for the properties columns; the output is plain
+    # JSON, so rows written either way read back the same
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Maximum number of rows sent to SQLite per executemany call
+BULK_BATCH_SIZE = 1000
+
+# With background writes, queued statements are committed once this many
+# seconds have passed since the first of them, or BULK_BATCH_SIZE are waiting
+WRITE_FLUSH_INTERVAL = 0.05
+
+# Maximum number of ids bound in one ``WHERE id IN (...)`` existence check,
+# well under SQLite's host parameter limit
+EXISTS_CHUNK_SIZE = 500
+
+# Entity fields stored in their own nodes columns rather than in the
+# properties JSON, with their column types
+_NODE_COLUMNS = (
+    ('original_text', 'TEXT'),
+    ('context', 'TEXT'),
+    ('start_pos', 'INTEGER'),
+    ('end_pos', 'INTEGER'),
+)
+_NODE_COLUMN_NAMES = tuple(name for name, _ in _NODE_COLUMNS)
 
-@dataclass
+# Separator between node ids in a find_paths trail (ASCII unit separator)
+_TRAIL_SEP = "\x1f"
+
+# GraphML attribute keys for the node and edge columns after the id (or
+# endpoints), in SELECT order. Properties are written as their JSON text.
+_GRAPHML_NODE_KEYS = (
+    ('label', 'string'),
+    ('type', 'string'),
+    ('properties', 'string'),
+    ('source_document', 'string'),
+    ('confidence', 'double'),
+    ('original_text', 'string'),
+    ('context', 'string'),
+    ('start_pos', 'long'),
+    ('end_pos', 'long'),
+)
+_GRAPHML_EDGE_KEYS = (
+    ('relationship', 'string'),
+    ('properties', 'string'),
+    ('confidence', 'double'),
+)
+
+# Applied once when the connection is opened. WAL lets readers run while a
+# write is in progress and, with synchronous=NORMAL, needs no fsync per commit.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+if orjson is not None:
+    def _dumps(obj: Any) -> str:
+        """Serialize to a JSON string."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    _loads = orjson.loads
+else:
+    _dumps = json.dumps
+    _loads = json.loads
+
+
+class _LazyProps(Mapping):
+    """Read-only properties mapping that decodes its JSON on first access."""
+
+    __slots__ = ('_raw', '_parsed')
+
+    def __init__(self, raw: str):
+        self._raw = raw
+        self._parsed = None
+
+    @property
+    def _data(self) -> Dict[str, Any]:
+        if self._parsed is None:
+            self._parsed = _loads(self._raw)
+        return self._parsed
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __deepcopy__(self, memo):
+        # dataclasses.asdict deep-copies field values; hand back a plain dict
+        # so Node/Edge results serialize like before
+        return copy.deepcopy(self._data, memo)
+
+
+def _properties(properties_json: Optional[str]) -> Mapping:
+    """Properties column value as a mapping, decoded lazily."""
+    return _LazyProps(properties_json) if properties_json else {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a nullable string column value."""
+    return sys.intern(value) if value is not None else None
+
+
+# Entity text is turned into node ids by mapping spaces to underscores
+_NORMALIZE = str.maketrans({' ': '_'})
+
+
+@lru_cache(maxsize=8192)
+def _make_node_id(prefix: str, text: str) -> str:
+    """Build the node id for ``text``, e.g. ``FREQUENCY_2.4_ghz``."""
+    return f"{prefix}_{text.translate(_NORMALIZE).lower()}"
+
+
+def _graphml_data(prefix: str, values: Iterable[Any]) -> str:
+    """Render non-null column values as GraphML data elements."""
+    return "".join(f'<data key="{prefix}{i}">{escape(str(value))}</data>'
+                   for i, value in enumerate(values) if value is not None)
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterable[List[tuple]]:
+    """Split rows into lists of at most ``size`` items."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+@dataclass(slots=True)
 class Node:
     """Represents a node in the knowledge graph."""
     id: str
@@ -24,9 +173,13 @@ class Node:
     properties: Dict[str, Any]
     source_document: str = ""
     confidence: float = 1.0
+    original_text: str = ""
+    context: str = ""
+    start_pos: Optional[int] = None
+    end_pos: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     """Represents an edge (relationship) in the knowledge graph."""
     source: str
@@ -39,12 +192,60 @@ class Edge:
 class KnowledgeGraph:
     """Manages the EMS doctrine knowledge graph."""
 
-    def __init__(self, db_path: str = None):
+    # Every write passes the exact same SQL text, so sqlite3's statement
+    # cache reuses one prepared statement per kind of row
+    _SQL_INSERT_NODE = (
+        "INSERT OR IGNORE INTO nodes (id, label, type, properties, source_document, confidence, "
+        "original_text, context, start_pos, end_pos) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    _SQL_SELECT_NODES = (
+        "SELECT id, label, type, properties, source_document, confidence, "
+        "original_text, context, start_pos, end_pos FROM nodes"
+    )
+    # As _SQL_INSERT_EDGE, but inserts nothing unless both endpoints exist.
+    # Used for queued writes, whose endpoints may still be in the queue when
+    # the edge is added.
+    _SQL_INSERT_EDGE_CHECKED = (
+        "INSERT OR IGNORE INTO edges (source, target, relationship, properties, confidence) "
+        "SELECT ?1, ?2, ?3, ?4, ?5 WHERE (SELECT COUNT(*) FROM nodes WHERE id IN (?1, ?2)) = "
+        "(CASE WHEN ?1 = ?2 THEN 1 ELSE 2 END)"
+    )
+    _SQL_SELECT_EDGES = "SELECT source, target, relationship, properties, confidence FROM edges"
+    _SQL_INSERT_EDGE = (
+        "INSERT OR IGNORE INTO edges (source, target, relationship, properties, confidence) "
+        "VALUES (?, ?, ?, ?, ?)"
+    )
+
+    # Simple paths from ?1 to ?3 with at most ?2 edges, one row per path. Each
+    # row carries the path walked so far as a trail of separated node ids, which
+    # is also used to refuse revisiting a node. Paths stop once they reach the
+    # target, as NetworkX's all_simple_paths does.
+    _SQL_FIND_PATHS = """
+        WITH RECURSIVE path(node, depth, trail) AS (
+            SELECT ?1, 0, ?1
+            UNION ALL
+            SELECT e.target, p.depth + 1, p.trail || char(31) || e.target
+            FROM path p JOIN edges e ON e.source = p.node
+            WHERE p.depth < ?2 AND p.node != ?3
+              AND instr(char(31) || p.trail || char(31), char(31) || e.target || char(31)) = 0
+        )
+        SELECT trail FROM path WHERE node = ?3
+    """
+    _SQL_COUNT_NODES_IN_PAIR = "SELECT COUNT(*) FROM nodes WHERE id IN (?, ?)"
+
+    def __init__(self, db_path: str = None, eager_load: bool = False,
+                 background_writes: bool = False):
         """
         Initialize the knowledge graph.
 
         Args:
             db_path: Path to SQLite database file
+            eager_load: Load the whole graph into memory now rather than on
+                first use by an operation that needs it
+            background_writes: Queue ``add_node``/``add_edge`` writes for a
+                writer thread that commits them in batches. Reads, bulk adds
+                and ``flush()`` wait for the queue to drain first.
         """
         self.logger = logging.getLogger(__name__)
 
@@ -54,18 +255,122 @@ class KnowledgeGraph:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Initialize NetworkX graph
-        self.graph = nx.MultiDiGraph()
+        # In-memory NetworkX copy of the database, filled on first access of
+        # self.graph. Queries read the database directly and never load it.
+        self._graph = nx.MultiDiGraph()
+        self._loaded = False
+
+        # Bumped on every change to the graph; lets callers detect staleness
+        self._version = 0
+
+        # One connection for the lifetime of the graph, so the PRAGMAs stay in
+        # effect. It runs in autocommit mode and _transaction() scopes writes;
+        # the lock serialises use from the API's worker threads.
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                     check_same_thread=False, cached_statements=256)
+        self._lock = threading.RLock()
+
+        # Writer thread for background_writes, fed (sql, params) pairs. It is
+        # started once the schema exists.
+        self._write_queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
 
         # Initialize database
         self._init_database()
 
+        if background_writes:
+            self._write_queue = queue.Queue()
+            self._writer = threading.Thread(target=self._writer_loop,
+                                            name="knowledge-graph-writer", daemon=True)
+            self._writer.start()
+
         # Load existing data
-        self._load_from_database()
+        if eager_load:
+            self._load_from_database()
+
+    def flush(self):
+        """Wait until all queued background writes are committed."""
+        if self._write_queue is not None and threading.current_thread() is not self._writer:
+            self._write_queue.join()
+
+    def close(self):
+        """Close the database connection. The graph must not be used afterwards."""
+        writer = getattr(self, '_writer', None)
+        if writer is not None:
+            self._write_queue.put(None)
+            writer.join()
+            self._writer = self._write_queue = None
+
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            conn.close()
+            self._conn = None
+
+    def __del__(self):
+        self.close()
+
+    @contextmanager
+    def _locked(self) -> Iterator[sqlite3.Connection]:
+        """Hold the shared connection once queued background writes are committed."""
+        self.flush()
+        with self._lock:
+            yield self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements in one transaction on the shared connection."""
+        with self._locked() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _writer_loop(self):
+        """Commit queued writes in batches until ``close()`` queues None."""
+        write_queue = self._write_queue
+        stopping = False
+        while not stopping:
+            item = write_queue.get()
+            if item is None:
+                write_queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+            while len(batch) < BULK_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    write_queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                with self._transaction() as conn:
+                    # Runs of the same statement go out as one executemany
+                    for sql, items in groupby(batch, key=lambda item: item[0]):
+                        conn.executemany(sql, [params for _, params in items])
+            except sqlite3.Error:
+                self.logger.exception(f"Failed to write {len(batch)} queued statements")
+            finally:
+                for _ in batch:
+                    write_queue.task_done()
 
     def _init_database(self):
         """Initialize the SQLite database with required tables."""
-        with sqlite3.connect(self.db_path) as conn:
+        for pragma in _PRAGMAS:
+            self._conn.execute(pragma)
+
+        with self._transaction() as conn:
             cursor = conn.cursor()
 
             # Create nodes table
@@ -77,9 +382,14 @@ class KnowledgeGraph:
                     properties TEXT,
                     source_document TEXT,
                     confidence REAL DEFAULT 1.0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    original_text TEXT,
+                    context TEXT,
+                    start_pos INTEGER,
+                    end_pos INTEGER
                 )
             """)
+            self._migrate_node_columns(cursor)
 
             # Create edges table
             cursor.execute("""
@@ -97,45 +407,125 @@ class KnowledgeGraph:
             """)
 
             # Create indexes
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_type ON nodes (type)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_label ON nodes (label)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_relationship ON edges (relationship)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_source ON edges (source)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_target ON edges (target)")
 
-            conn.commit()
+            # original_text is the usual query_nodes property filter; it used
+            # to live in the properties JSON and now has its own column
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_original_text ON nodes (original_text)")
 
-        self.logger.info(f"Database initialized at {self.db_path}")
+            # Composite indexes matching the lookups, so neighbor and
+            # relationship queries are answered from the index alone
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_type_id ON nodes (type, id, label)")
+            self._create_unique_edge_index(cursor)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_tgt_rel_src ON edges (target, relationship, source)")
 
-    def _load_from_database(self):
-        """Load existing nodes and edges from database into NetworkX graph."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # Load nodes
-            cursor.execute("SELECT id, label, type, properties, source_document, confidence FROM nodes")
-            for row in cursor.fetchall():
-                node_id, label, node_type, properties_json, source_doc, confidence = row
-                properties = json.loads(properties_json) if properties_json else {}
+            # Single-column indexes that are prefixes of the ones above
+            cursor.execute("DROP INDEX IF EXISTS idx_nodes_type")
+            cursor.execute("DROP INDEX IF EXISTS idx_edges_source")
+            cursor.execute("DROP INDEX IF EXISTS idx_edges_target")
 
-                self.graph.add_node(node_id,
-                                  label=label,
-                                  type=node_type,
-                                  properties=properties,
-                                  source_document=source_doc,
-                                  confidence=confidence)
+            # Superseded by the unique index on the same columns
+            cursor.execute("DROP INDEX IF EXISTS idx_edges_src_rel_tgt")
 
-            # Load edges
-            cursor.execute("SELECT source, target, relationship, properties, confidence FROM edges")
-            for row in cursor.fetchall():
-                source, target, relationship, properties_json, confidence = row
-                properties = json.loads(properties_json) if properties_json else {}
+        self.logger.info(f"Database initialized at {self.db_path}")
 
-                self.graph.add_edge(source, target,
-                                  relationship=relationship,
-                                  properties=properties,
-                                  confidence=confidence)
+    def _create_unique_edge_index(self, cursor: sqlite3.Cursor):
+        """Make edges unique per (source, relationship, target), dropping older duplicates."""
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_edges_unique'").fetchone()
+        if exists:
+            return
+
+        cursor.execute("DELETE FROM edges WHERE id NOT IN "
+                       "(SELECT MIN(id) FROM edges GROUP BY source, relationship, target)")
+        if cursor.rowcount > 0:
+            self.logger.info(f"Removed {cursor.rowcount} duplicate edges")
+        cursor.execute("CREATE UNIQUE INDEX idx_edges_unique ON edges (source, relationship, target)")
+
+    def _migrate_node_columns(self, cursor: sqlite3.Cursor):
+        """Add the entity field columns to an older nodes table and move the values out of properties."""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(nodes)")}
+        missing = [(name, sql_type) for name, sql_type in _NODE_COLUMNS if name not in existing]
+        if not missing:
+            return
+
+        for name, sql_type in missing:
+            cursor.execute(f"ALTER TABLE nodes ADD COLUMN {name} {sql_type}")
+
+        names = [name for name, _ in missing]
+        assignments = ", ".join(f"{name} = json_extract(properties, '$.{name}')" for name in names)
+        paths = ", ".join(f"'$.{name}'" for name in names)
+        cursor.execute(f"UPDATE nodes SET {assignments}, properties = json_remove(properties, {paths}) "
+                       "WHERE properties IS NOT NULL")
+        self.logger.info(f"Moved {', '.join(names)} out of node properties")
+
+    @property
+    def graph(self) -> nx.MultiDiGraph:
+        """NetworkX copy of the graph, loaded from the database on first use."""
+        if not self._loaded:
+            self._load_from_database()
+        return self._graph
 
-        self.logger.info(f"Loaded {self.graph.number_of_nodes()} nodes and {self.graph.number_of_edges()} edges")
+    def _load_from_database(self):
+        """Load existing nodes and edges from database into NetworkX graph."""
+        with self._locked():
+            if self._loaded:
+                return
+            cursor = self._conn.cursor()
+
+            # Properties are decoded only when read, and rows with identical
+            # properties JSON share one mapping
+            decoded: Dict[str, Mapping] = {}
+
+            def load_properties(properties_json):
+                properties = decoded.get(properties_json)
+                if properties is None:
+                    properties = decoded[properties_json] = _properties(properties_json)
+                return properties
+
+            # Types, relationships and document names repeat across many
+            # rows and are interned. Edge endpoints reuse the node id strings.
+            node_ids: Dict[str, str] = {}
+
+            def node_items(rows):
+                for row in rows:
+                    node_id, label, node_type, properties_json, source_doc, confidence = row[:6]
+                    node_ids[node_id] = node_id
+                    yield node_id, {
+                        'label': label,
+                        'type': sys.intern(node_type),
+                        'properties': load_properties(properties_json),
+                        'source_document': _intern(source_doc),
+                        'confidence': confidence,
+                        **dict(zip(_NODE_COLUMN_NAMES, row[6:]))
+                    }
+
+            def edge_items(rows):
+                for source, target, relationship, properties_json, confidence in rows:
+                    relationship = sys.intern(relationship)
+                    yield node_ids.get(source, source), node_ids.get(target, target), relationship, {
+                        'relationship': relationship,
+                        'properties': load_properties(properties_json),
+                        'confidence': confidence
+                    }
+
+            # Load nodes, then edges, each with a single NetworkX bulk call.
+            # Rows are streamed from the cursor rather than fetched into a list.
+            cursor.execute(self._SQL_SELECT_NODES)
+            self._graph.add_nodes_from(node_items(cursor))
+
+            cursor.execute(self._SQL_SELECT_EDGES)
+            self._graph.add_edges_from(edge_items(cursor))
+
+            self._loaded = True
+
+        self.logger.info(f"Loaded {self._graph.number_of_nodes()} nodes and {self._graph.number_of_edges()} edges")
+
+    @property
+    def version(self) -> int:
+        """Counter that changes whenever nodes or edges are added or cleared."""
+        return self._version
 
     def add_node(self, node: Node) -> bool:
         """
@@ -145,29 +535,43 @@ class KnowledgeGraph:
             node: Node to add
 
         Returns:
-            True if node was added, False if it already exists
+            True if node was added, False if it already exists. With
+            background writes and no loaded graph, True only means the node
+            was queued.
         """
-        if node.id in self.graph:
-            self.logger.debug(f"Node {node.id} already exists")
-            return False
-
-        # Add to NetworkX graph
-        self.graph.add_node(node.id,
-                          label=node.label,
-                          type=node.type,
-                          properties=node.properties,
-                          source_document=node.source_document,
-                          confidence=node.confidence)
-
-        # Add to database
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO nodes (id, label, type, properties, source_document, confidence)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (node.id, node.label, node.type, json.dumps(node.properties),
-                  node.source_document, node.confidence))
-            conn.commit()
+        params = (node.id, node.label, node.type, _dumps(node.properties),
+                  node.source_document, node.confidence, node.original_text,
+                  node.context, node.start_pos, node.end_pos)
+
+        if self._write_queue is not None:
+            # Without a loaded graph, duplicates are left to INSERT OR IGNORE
+            # when the queued write runs
+            if self._loaded and node.id in self._graph:
+                self.logger.debug(f"Node {node.id} already exists")
+                return False
+            self._write_queue.put((self._SQL_INSERT_NODE, params))
+        else:
+            # The primary key decides whether the node is new, so this works
+            # whether or not the graph has been loaded
+            with self._transaction() as conn:
+                if conn.execute(self._SQL_INSERT_NODE, params).rowcount != 1:
+                    self.logger.debug(f"Node {node.id} already exists")
+                    return False
+
+        with self._lock:
+            # Add to NetworkX graph
+            if self._loaded:
+                self._graph.add_node(node.id,
+                                     label=node.label,
+                                     type=node.type,
+                                     properties=node.properties,
+                                     source_document=node.source_document,
+                                     confidence=node.confidence,
+                                     original_text=node.original_text,
+                                     context=node.context,
+                                     start_pos=node.start_pos,
+                                     end_pos=node.end_pos)
+            self._version += 1
 
         self.logger.debug(f"Added node: {node.id}")
         return True
@@ -180,31 +584,194 @@ class KnowledgeGraph:
             edge: Edge to add
 
         Returns:
-            True if edge was added, False if nodes don't exist
+            True if edge was added, False if nodes don't exist or the edge
+            already exists. With background writes and no loaded graph, True
+            only means the edge was queued.
         """
-        if edge.source not in self.graph or edge.target not in self.graph:
-            self.logger.warning(f"Cannot add edge: missing nodes {edge.source} or {edge.target}")
-            return False
-
-        # Add to NetworkX graph
-        self.graph.add_edge(edge.source, edge.target,
-                          relationship=edge.relationship,
-                          properties=edge.properties,
-                          confidence=edge.confidence)
-
-        # Add to database
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO edges (source, target, relationship, properties, confidence)
-                VALUES (?, ?, ?, ?, ?)
-            """, (edge.source, edge.target, edge.relationship,
-                  json.dumps(edge.properties), edge.confidence))
-            conn.commit()
+        params = (edge.source, edge.target, edge.relationship,
+                  _dumps(edge.properties), edge.confidence)
+
+        if self._write_queue is not None:
+            with self._lock:
+                if self._loaded:
+                    if edge.source not in self._graph or edge.target not in self._graph:
+                        self.logger.warning(f"Cannot add edge: missing nodes {edge.source} or {edge.target}")
+                        return False
+                    if self._graph.has_edge(edge.source, edge.target, edge.relationship):
+                        return False
+            # Endpoints are checked when the write runs, after any queued nodes
+            self._write_queue.put((self._SQL_INSERT_EDGE_CHECKED, params))
+        else:
+            with self._transaction() as conn:
+                found = conn.execute(self._SQL_COUNT_NODES_IN_PAIR, (edge.source, edge.target)).fetchone()[0]
+                if found != len({edge.source, edge.target}):
+                    self.logger.warning(f"Cannot add edge: missing nodes {edge.source} or {edge.target}")
+                    return False
+
+                # Edges are unique per (source, relationship, target)
+                if conn.execute(self._SQL_INSERT_EDGE, params).rowcount != 1:
+                    self.logger.debug(f"Edge {edge.source} -> {edge.target} ({edge.relationship}) already exists")
+                    return False
+
+        with self._lock:
+            # Add to NetworkX graph, keyed by relationship
+            if self._loaded:
+                self._graph.add_edge(edge.source, edge.target, key=edge.relationship,
+                                     relationship=edge.relationship,
+                                     properties=edge.properties,
+                                     confidence=edge.confidence)
+            self._version += 1
 
         self.logger.debug(f"Added edge: {edge.source} -> {edge.target} ({edge.relationship})")
         return True
 
+    def add_entities_bulk(self, rows_by_type: Dict[str, List[Dict[str, Any]]],
+                          document_name: str = "") -> int:
+        """
+        Add many nodes at once, grouped by node type.
+
+        Each row is a dict with ``id``, ``label`` and optionally ``properties``,
+        ``confidence`` and the entity fields ``original_text``, ``context``,
+        ``start_pos`` and ``end_pos``. Rows are written with one ``executemany`` per batch
+        of ``BULK_BATCH_SIZE`` inside a single transaction, and added to the
+        NetworkX graph, if it is loaded, with a single ``add_nodes_from`` call
+        once the transaction has committed. Ids already stored are found with chunked ``WHERE id IN``
+        queries rather than one lookup per row.
+
+        Args:
+            rows_by_type: Mapping of node type to node rows
+            document_name: Name of source document
+
+        Returns:
+            Number of nodes actually added
+        """
+        added: List[Tuple[str, Dict[str, Any]]] = []
+
+        with self._transaction() as conn:
+            existing = self._existing_node_ids(
+                conn, {row['id'] for rows in rows_by_type.values() for row in rows})
+
+            for node_type, rows in rows_by_type.items():
+                # Keyed by id, so duplicates within the batch are skipped too
+                new_nodes: Dict[str, Dict[str, Any]] = {}
+                for row in rows:
+                    node_id = row['id']
+                    if node_id in existing or node_id in new_nodes:
+                        continue
+                    new_nodes[node_id] = {
+                        'label': row['label'],
+                        'type': node_type,
+                        'properties': row.get('properties', {}),
+                        'source_document': row.get('source_document', document_name),
+                        'confidence': row.get('confidence', 1.0),
+                        'original_text': row.get('original_text', ''),
+                        'context': row.get('context', ''),
+                        'start_pos': row.get('start_pos'),
+                        'end_pos': row.get('end_pos')
+                    }
+
+                self._bulk_insert_nodes(conn, new_nodes.items())
+
+                existing.update(new_nodes)
+                added.extend(new_nodes.items())
+
+        # Only committed rows reach the NetworkX graph
+        nodes_added = len(added)
+        if nodes_added:
+            with self._lock:
+                if self._loaded:
+                    self._graph.add_nodes_from(added)
+                self._version += 1
+
+        self.logger.debug(f"Bulk added {nodes_added} nodes")
+        return nodes_added
+
+    def add_relationships_bulk(self, rows_by_relationship: Dict[str, List[Dict[str, Any]]]) -> int:
+        """
+        Add many edges at once, grouped by relationship type.
+
+        Each row is a dict with ``source``, ``target`` and optionally
+        ``properties`` and ``confidence``. Rows whose endpoints are not in the
+        graph, or whose edge already exists, are skipped, matching ``add_edge``.
+
+        Args:
+            rows_by_relationship: Mapping of relationship type to edge rows
+
+        Returns:
+            Number of edges actually added
+        """
+        edges_added = 0
+        added: List[Tuple[str, str, str, Dict[str, Any]]] = []
+
+        with self._transaction() as conn:
+            existing = self._existing_node_ids(
+                conn, {node_id for rows in rows_by_relationship.values()
+                       for row in rows for node_id in (row['source'], row['target'])})
+
+            for relationship, rows in rows_by_relationship.items():
+                # Keyed by endpoints, so duplicates within the batch are skipped too
+                new_edges: Dict[Tuple[str, str], Dict[str, Any]] = {}
+                for row in rows:
+                    source, target = row['source'], row['target']
+                    if source not in existing or target not in existing:
+                        self.logger.warning(f"Cannot add edge: missing nodes {source} or {target}")
+                        continue
+                    if (source, target) in new_edges:
+                        continue
+                    new_edges[source, target] = {
+                        'relationship': relationship,
+                        'properties': row.get('properties', {}),
+                        'confidence': row.get('confidence', 1.0)
+                    }
+
+                # Edges already stored are ignored by the unique index
+                changes = conn.total_changes
+                self._bulk_insert_edges(conn, ((source, target, attrs)
+                                               for (source, target), attrs in new_edges.items()))
+                edges_added += conn.total_changes - changes
+
+                added.extend((source, target, relationship, attrs)
+                             for (source, target), attrs in new_edges.items())
+
+        # Only committed rows reach the NetworkX graph
+        if edges_added:
+            with self._lock:
+                if self._loaded:
+                    self._graph.add_edges_from(
+                        edge for edge in added if not self._graph.has_edge(*edge[:3]))
+                self._version += 1
+
+        self.logger.debug(f"Bulk added {edges_added} edges")
+        return edges_added
+
+    def _existing_node_ids(self, conn: sqlite3.Connection, node_ids: Iterable[str]) -> set:
+        """Return the subset of ``node_ids`` already stored, in chunks of ``EXISTS_CHUNK_SIZE``."""
+        existing = set()
+        for chunk in _batched(node_ids, EXISTS_CHUNK_SIZE):
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = conn.execute(f"SELECT id FROM nodes WHERE id IN ({placeholders})", chunk)
+            existing.update(node_id for (node_id,) in cursor)
+        return existing
+
+    def _bulk_insert_nodes(self, conn: sqlite3.Connection,
+                           nodes: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Write (node id, attributes) pairs to the nodes table in batches."""
+        rows = ((node_id, attrs['label'], attrs['type'], _dumps(attrs['properties']),
+                 attrs['source_document'], attrs['confidence'], attrs['original_text'],
+                 attrs['context'], attrs['start_pos'], attrs['end_pos'])
+                for node_id, attrs in nodes)
+        for batch in _batched(rows, BULK_BATCH_SIZE):
+            conn.executemany(self._SQL_INSERT_NODE, batch)
+
+    def _bulk_insert_edges(self, conn: sqlite3.Connection,
+                           edges: Iterable[Tuple[str, str, Dict[str, Any]]]):
+        """Write (source, target, attributes) triples to the edges table in batches."""
+        rows = ((source, target, attrs['relationship'], _dumps(attrs['properties']),
+                 attrs['confidence'])
+                for source, target, attrs in edges)
+        for batch in _batched(rows, BULK_BATCH_SIZE):
+            conn.executemany(self._SQL_INSERT_EDGE, batch)
+
     def add_entities_from_document(self, entities: List[Entity], document_name: str):
         """
         Add entities from a document to the knowledge graph.
@@ -213,28 +780,22 @@ class KnowledgeGraph:
             entities: List of entities to add
             document_name: Name of source document
         """
-        nodes_added = 0
+        rows_by_type: Dict[str, List[Dict[str, Any]]] = {}
         for entity in entities:
             # Create unique node ID
-            node_id = f"{entity.label}_{entity.text.replace(' ', '_').lower()}"
-
-            node = Node(
-                id=node_id,
-                label=entity.text,
-                type=entity.label,
-                properties={
-                    'original_text': entity.text,
-                    'context': entity.context,
-                    'start_pos': entity.start,
-                    'end_pos': entity.end
-                },
-                source_document=document_name,
-                confidence=entity.confidence
-            )
-
-            if self.add_node(node):
-                nodes_added += 1
-
+            node_id = _make_node_id(entity.label, entity.text)
+
+            rows_by_type.setdefault(entity.label, []).append({
+                'id': node_id,
+                'label': entity.text,
+                'original_text': entity.text,
+                'context': entity.context,
+                'start_pos': entity.start,
+                'end_pos': entity.end,
+                'confidence': entity.confidence
+            })
+
+        nodes_added = self.add_entities_bulk(rows_by_type, document_name)
         self.logger.info(f"Added {nodes_added} nodes from document {document_name}")
 
     def add_relationships_from_data(self, relationships: List[Dict], document_name: str):
@@ -245,42 +806,34 @@ class KnowledgeGraph:
             relationships: List of relationship dictionaries
             document_name: Name of source document
         """
-        edges_added = 0
+        node_rows = []
+        rows_by_relationship: Dict[str, List[Dict[str, Any]]] = {}
         for rel in relationships:
             # Create node IDs (simplified approach)
-            source_id = f"entity_{rel['subject'].replace(' ', '_').lower()}"
-            target_id = f"entity_{rel['object'].replace(' ', '_').lower()}"
+            source_id = _make_node_id('entity', rel['subject'])
+            target_id = _make_node_id('entity', rel['object'])
 
             # Add nodes if they don't exist
-            source_node = Node(
-                id=source_id,
-                label=rel['subject'],
-                type='ENTITY',
-                properties={'original_text': rel['subject']},
-                source_document=document_name
-            )
-            target_node = Node(
-                id=target_id,
-                label=rel['object'],
-                type='ENTITY',
-                properties={'original_text': rel['object']},
-                source_document=document_name
-            )
-
-            self.add_node(source_node)
-            self.add_node(target_node)
-
-            # Add edge
-            edge = Edge(
-                source=source_id,
-                target=target_id,
-                relationship=rel['predicate'],
-                properties={'context': rel.get('context', '')},
-                confidence=rel.get('confidence', 0.8)
-            )
-
-            if self.add_edge(edge):
-                edges_added += 1
+            node_rows.append({
+                'id': source_id,
+                'label': rel['subject'],
+                'original_text': rel['subject']
+            })
+            node_rows.append({
+                'id': target_id,
+                'label': rel['object'],
+                'original_text': rel['object']
+            })
+
+            rows_by_relationship.setdefault(rel['predicate'], []).append({
+                'source': source_id,
+                'target': target_id,
+                'properties': {'context': rel.get('context', '')},
+                'confidence': rel.get('confidence', 0.8)
+            })
+
+        self.add_entities_bulk({'ENTITY': node_rows}, document_name)
+        edges_added = self.add_relationships_bulk(rows_by_relationship)
 
         self.logger.info(f"Added {edges_added} relationships from document {document_name}")
 
@@ -290,39 +843,64 @@ class KnowledgeGraph:
 
         Args:
             node_type: Filter by node type
-            properties: Filter by node properties
+            properties: Filter by node properties; the entity fields
+                (``original_text``, ``context``, ``start_pos``, ``end_pos``)
+                are matched against their columns
 
         Returns:
             List of matching nodes
         """
+        clauses, params = [], []
+        if node_type:
+            clauses.append("type = ?")
+            params.append(node_type)
+
+        # Scalar property values are compared in SQL. json_extract cannot tell
+        # a JSON null from a missing key, or compare objects and arrays, so
+        # those filters are checked on the decoded properties instead.
+        residual = {}
+        for key, value in (properties or {}).items():
+            if key in _NODE_COLUMN_NAMES:
+                clauses.append(f"{key} IS ?")
+                params.append(value)
+            elif value is None or isinstance(value, (dict, list)) or '"' in key:
+                residual[key] = value
+            else:
+                clauses.append("json_extract(properties, ?) = ?")
+                params.extend((f'$."{key}"', value))
+
+        sql = self._SQL_SELECT_NODES
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rowid"
+
         results = []
+        with self._locked():
+            rows = self._conn.execute(sql, params).fetchall()
 
-        for node_id, node_data in self.graph.nodes(data=True):
-            # Filter by type
-            if node_type and node_data.get('type') != node_type:
+        for row in rows:
+            node_id, label, node_type_, properties_json, source_doc, confidence = row[:6]
+
+            # Only decoded here if a filter has to look at it
+            node_props = _properties(properties_json)
+
+            # Filter by the remaining properties
+            if any(key not in node_props or node_props[key] != value
+                   for key, value in residual.items()):
                 continue
 
-            # Filter by properties
-            if properties:
-                match = True
-                node_props = node_data.get('properties', {})
-                for key, value in properties.items():
-                    if key not in node_props or node_props[key] != value:
-                        match = False
-                        break
-                if not match:
-                    continue
-
-            # Create Node object
-            node = Node(
+            results.append(Node(
                 id=node_id,
-                label=node_data.get('label', ''),
-                type=node_data.get('type', ''),
-                properties=node_data.get('properties', {}),
-                source_document=node_data.get('source_document', ''),
-                confidence=node_data.get('confidence', 1.0)
-            )
-            results.append(node)
+                label=label,
+                type=sys.intern(node_type_),
+                properties=node_props,
+                source_document=sys.intern(source_doc or ''),
+                confidence=confidence,
+                original_text=row[6] or '',
+                context=row[7] or '',
+                start_pos=row[8],
+                end_pos=row[9]
+            ))
 
         return results
 
@@ -339,32 +917,32 @@ class KnowledgeGraph:
         Returns:
             List of matching edges
         """
-        results = []
-
-        for s, t, edge_data in self.graph.edges(data=True):
-            # Filter by source
-            if source and s != source:
-                continue
-
-            # Filter by target
-            if target and t != target:
-                continue
-
-            # Filter by relationship
-            if relationship and edge_data.get('relationship') != relationship:
-                continue
-
-            # Create Edge object
-            edge = Edge(
-                source=s,
-                target=t,
-                relationship=edge_data.get('relationship', ''),
-                properties=edge_data.get('properties', {}),
-                confidence=edge_data.get('confidence', 1.0)
-            )
-            results.append(edge)
-
-        return results
+        clauses, params = [], []
+        for column, value in (('source', source), ('target', target), ('relationship', relationship)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        sql = self._SQL_SELECT_EDGES
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # Unary plus, as in get_neighbors, so the ordering does not steer the
+        # planner away from the composite indexes
+        sql += " ORDER BY +id"
+
+        # Edges are built straight from the cursor; properties stay
+        # undecoded until read
+        with self._locked():
+            return [
+                Edge(
+                    source=s,
+                    target=t,
+                    relationship=sys.intern(rel),
+                    properties=_properties(properties_json),
+                    confidence=confidence
+                )
+                for s, t, rel, properties_json, confidence in self._conn.execute(sql, params)
+            ]
 
     def find_paths(self, source: str, target: str, max_length: int = 3) -> List[List[str]]:
         """
@@ -378,14 +956,16 @@ class KnowledgeGraph:
         Returns:
             List of paths (each path is a list of node IDs)
         """
-        if source not in self.graph or target not in self.graph:
+        if max_length < 0:
             return []
 
-        try:
-            paths = list(nx.all_simple_paths(self.graph, source, target, cutoff=max_length))
-            return paths
-        except nx.NetworkXNoPath:
-            return []
+        with self._locked():
+            found = self._conn.execute(self._SQL_COUNT_NODES_IN_PAIR, (source, target)).fetchone()[0]
+            if found != len({source, target}):
+                return []
+            rows = self._conn.execute(self._SQL_FIND_PATHS, (source, max_length, target)).fetchall()
+
+        return [trail.split(_TRAIL_SEP) for trail, in rows]
 
     def get_neighbors(self, node_id: str, relationship: str = None) -> List[str]:
         """
@@ -396,63 +976,86 @@ class KnowledgeGraph:
             relationship: Filter by relationship type
 
         Returns:
-            List of neighbor node IDs
+            List of neighbor node IDs, successors first
         """
-        if node_id not in self.graph:
-            return []
-
-        neighbors = []
-
-        # Outgoing edges
-        for target, edge_data in self.graph[node_id].items():
-            if relationship is None or edge_data.get('relationship') == relationship:
-                neighbors.append(target)
-
-        # Incoming edges
-        for source in self.graph.predecessors(node_id):
-            edge_data = self.graph[source][node_id]
-            if relationship is None or edge_data.get('relationship') == relationship:
-                if source not in neighbors:
-                    neighbors.append(source)
-
-        return neighbors
+        # Filter on the relationship only when given, so both lookups probe
+        # the composite indexes on (endpoint, relationship). "+id" keeps the
+        # planner from picking idx_edges_relationship just to avoid the sort.
+        params = (node_id,) if relationship is None else (node_id, relationship)
+        rel_clause = "" if relationship is None else " AND relationship = ?"
+        with self._locked():
+            # Outgoing edges, then incoming ones
+            targets = self._conn.execute(
+                f"SELECT target FROM edges WHERE source = ?{rel_clause} ORDER BY +id", params).fetchall()
+            sources = self._conn.execute(
+                f"SELECT source FROM edges WHERE target = ?{rel_clause} ORDER BY +id", params).fetchall()
+
+        return list(dict.fromkeys(row[0] for row in targets + sources))
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get knowledge graph statistics."""
-        node_types = {}
-        edge_types = {}
-
-        # Count node types
-        for _, node_data in self.graph.nodes(data=True):
-            node_type = node_data.get('type', 'UNKNOWN')
-            node_types[node_type] = node_types.get(node_type, 0) + 1
-
-        # Count edge types
-        for _, _, edge_data in self.graph.edges(data=True):
-            edge_type = edge_data.get('relationship', 'UNKNOWN')
-            edge_types[edge_type] = edge_types.get(edge_type, 0) + 1
-
+        # One scan of each table, read from the covering indexes, feeds both
+        # the type counts and a union-find for connectivity, so the graph is
+        # never loaded or copied
+        node_types, edge_types = Counter(), Counter()
+        components = nx.utils.UnionFind()
+        with self._locked():
+            for node_id, node_type in self._conn.execute("SELECT id, type FROM nodes"):
+                node_types[node_type] += 1
+                components[node_id]  # registers isolated nodes too
+
+            for source, target, relationship in self._conn.execute(
+                    "SELECT source, target, relationship FROM edges"):
+                edge_types[relationship] += 1
+                components.union(source, target)
+
+        number_of_components = sum(1 for _ in components.to_sets())
         return {
-            'total_nodes': self.graph.number_of_nodes(),
-            'total_edges': self.graph.number_of_edges(),
-            'node_types': node_types,
-            'edge_types': edge_types,
-            'is_connected': nx.is_connected(self.graph.to_undirected()),
-            'number_of_components': nx.number_connected_components(self.graph.to_undirected())
+            'total_nodes': node_types.total(),
+            'total_edges': edge_types.total(),
+            'node_types': dict(sorted(node_types.items())),
+            'edge_types': dict(sorted(edge_types.items())),
+            'is_connected': number_of_components == 1,
+            'number_of_components': number_of_components
         }
 
     def export_graphml(self, file_path: str):
-        """Export graph to GraphML format for visualization."""
-        nx.write_graphml(self.graph, file_path)
+        """
+        Export graph to GraphML format for visualization.
+
+        Rows are streamed from the database to the file, so the graph is never
+        loaded into memory.
+        """
+        with self._locked(), open(file_path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                    '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+            for prefix, domain, keys in (('n', 'node', _GRAPHML_NODE_KEYS),
+                                         ('e', 'edge', _GRAPHML_EDGE_KEYS)):
+                for i, (name, kind) in enumerate(keys):
+                    f.write(f'<key id="{prefix}{i}" for="{domain}" '
+                            f'attr.name="{name}" attr.type="{kind}"/>\n')
+            f.write('<graph edgedefault="directed">\n')
+
+            for node_id, *values in self._conn.execute(self._SQL_SELECT_NODES + " ORDER BY rowid"):
+                f.write(f'<node id={quoteattr(node_id)}>{_graphml_data("n", values)}</node>\n')
+
+            for source, target, *values in self._conn.execute(self._SQL_SELECT_EDGES + " ORDER BY id"):
+                f.write(f'<edge source={quoteattr(source)} target={quoteattr(target)}>'
+                        f'{_graphml_data("e", values)}</edge>\n')
+
+            f.write('</graph>\n</graphml>\n')
+
         self.logger.info(f"Exported graph to {file_path}")
 
     def clear_all(self):
         """Clear all data from the knowledge graph."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM edges")
             cursor.execute("DELETE FROM nodes")
-            conn.commit()
 
-        self.graph.clear()
+        with self._lock:
+            self._graph.clear()
+            self._loaded = True
+            self._version += 1
         self.logger.info("Cleared all data from knowledge graph")
\ No newline at end of file
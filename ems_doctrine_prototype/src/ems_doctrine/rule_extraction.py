@@ -4,15 +4,95 @@ from EMS doctrine text using deontic logic patterns.
 """
 
 import re
+import sys
 import logging
+import threading
 from enum import Enum
-from typing import List, Dict, Set, Optional, Tuple
-from dataclasses import dataclass
+from typing import Iterable, List, Dict, Set, Optional, Tuple
+from dataclasses import dataclass, field, fields, replace
 import spacy
-from spacy.matcher import Matcher
+from spacy.attrs import IS_STOP, LEMMA, POS
+from spacy.parts_of_speech import IDS as POS_IDS, NOUN, PROPN, VERB
 
 from .config import config
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    # Serializes the Rule dataclasses natively in C when exporting
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # google-re2 matches in linear time, so the open-ended rule patterns
+    # below cannot backtrack catastrophically on long sentences.
+    import re2 as regex_engine
+except ImportError:
+    regex_engine = re
+
+
+# Common military rule patterns, matched case-insensitively
+REGEX_RULE_PATTERNS = [
+    # "Commanders must ensure..."
+    (r'(\w+(?:\s+\w+)*)\s+(must|shall|will)\s+(ensure|verify|confirm)\s+(.+)', "OBLIGATION"),
+
+    # "Personnel may not..."
+    (r'(\w+(?:\s+\w+)*)\s+(may\s+not|cannot|shall\s+not)\s+(.+)', "PROHIBITION"),
+
+    # "Units are authorized to..."
+    (r'(\w+(?:\s+\w+)*)\s+(?:are|is)\s+(authorized|permitted|allowed)\s+to\s+(.+)', "PERMISSION"),
+
+    # "It is prohibited to..."
+    (r'[Ii]t\s+is\s+(prohibited|forbidden)\s+to\s+(.+)', "PROHIBITION"),
+
+    # "Frequency X must be coordinated..."
+    (r'([Ff]requency\s+\w+)\s+(must|shall)\s+be\s+(.+)', "OBLIGATION"),
+
+    # "EMS operations require..."
+    (r'(EMS\s+operations?|Electronic\s+warfare)\s+(require|need)\s+(.+)', "OBLIGATION"),
+]
+
+# Rule count above which detect_conflicts scores candidate pairs with numpy;
+# below it, building the arrays costs more than the Python loop
+VECTORIZED_CONFLICT_THRESHOLD = 100
+
+# Token attributes read by _extract_rule_components, one column each in the
+# sentence's to_array matrix
+_TOKEN_ATTRS = [POS, IS_STOP, LEMMA]
+
+# Lemmas that open a rule's condition, and verbs that are not taken as the
+# action when the deontic expression is not followed by one
+_CONDITION_KEYWORDS = ("if", "when", "unless", "provided", "except", "during")
+_AUXILIARY_LEMMAS = ("be", "have", "do")
+
+# POS ids of the tokens taken as subject and object words
+_NOUN_POS = frozenset((NOUN, PROPN))
+
+# Number of texts spaCy parses together in nlp.pipe
+PIPE_BATCH_SIZE = 64
+
+# Longer section texts are split at blank lines into chunks of about this
+# many characters, so the parser never holds a whole long document at once
+MAX_CHUNK_CHARS = 50_000
+
+# Number of distinct sentences whose extracted rules are memoized; doctrine
+# repeats a lot of boilerplate sentences verbatim
+SENTENCE_CACHE_SIZE = 10_000
+
+# Cheap prefilter: a sentence can only yield a rule if it contains one of the
+# trigger words used by the token or regex patterns. Stems are left open so
+# inflections (requires, authorized, prohibited) and contractions still pass;
+# "shan't", which spaCy splits into "sha" + "n't", is spelled out.
+_DEONTIC_RE = re.compile(
+    r"\b(?:must|shall|will|may|can|need|requir|authori[sz]|permi|allow|prohibit|forbid)"
+    r"|\bsha(?=n['’]t\b)|'ll\b",
+    re.IGNORECASE,
+)
+
 
 class DeonticType(Enum):
     """Types of deontic modalities."""
@@ -21,7 +101,20 @@ class DeonticType(Enum):
     PROHIBITION = "prohibition"   # must not, shall not, prohibited, forbidden
 
 
-@dataclass
+# REGEX_RULE_PATTERNS fused into one alternation, compiled once at import
+# time, so each sentence is scanned once. Pattern i is the named group "g<i>"
+# and its own groups follow it; _REGEX_GROUPS maps each name to the rule type,
+# first group number and group count of its pattern.
+_FUSED_REGEX = regex_engine.compile("(?i)" + "|".join(
+    f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(REGEX_RULE_PATTERNS)
+))
+_REGEX_GROUPS = {
+    f"g{i}": (DeonticType[type_name], _FUSED_REGEX.groupindex[f"g{i}"], re.compile(pattern).groups)
+    for i, (pattern, type_name) in enumerate(REGEX_RULE_PATTERNS)
+}
+
+
+@dataclass(slots=True)
 class Rule:
     """Represents a rule extracted from doctrine text."""
     id: str
@@ -35,9 +128,19 @@ class Rule:
     source_document: str
     section: str
     context: str
+    # Lowercased subject, action and object, computed once for the
+    # similarity and subject lookups instead of on every comparison
+    _subject_lc: str = field(init=False, repr=False, compare=False)
+    _action_lc: str = field(init=False, repr=False, compare=False)
+    _object_lc: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._subject_lc = sys.intern(self.subject.lower())
+        self._action_lc = sys.intern(self.action.lower())
+        self._object_lc = sys.intern(self.object.lower())
 
 
-@dataclass
+@dataclass(slots=True)
 class RuleConflict:
     """Represents a conflict between two rules."""
     rule1_id: str
@@ -54,14 +157,15 @@ class RuleExtractor:
         """Initialize the rule extractor."""
         self.logger = logging.getLogger(__name__)
 
-        # Load spaCy model
+        # Load spaCy model. Rules are matched on POS and lemma, so the
+        # tagger, attribute_ruler and lemmatizer stay, as does the parser for
+        # sentence boundaries; the entity recognizer and text classifier do
+        # not feed into matching and are not loaded.
+        excluded = ["ner", "textcat"]
         try:
-            self.nlp = spacy.load(config.spacy_model)
+            self.nlp = spacy.load(config.spacy_model, exclude=excluded)
         except OSError:
-            self.nlp = spacy.load("en_core_web_sm")
-
-        # Initialize matcher
-        self.matcher = Matcher(self.nlp.vocab)
+            self.nlp = spacy.load("en_core_web_sm", exclude=excluded)
 
         # Load deontic keywords from config
         self.deontic_keywords = config.deontic_keywords
@@ -69,12 +173,42 @@ class RuleExtractor:
         # Set up rule patterns
         self._setup_rule_patterns()
 
-        # Rule storage
+        # Lemma hashes compared against the LEMMA column. Conditions match the
+        # lowercase, capitalised and uppercase forms of each keyword.
+        strings = self.nlp.vocab.strings
+        self._condition_lemmas = frozenset(
+            strings.add(form) for word in _CONDITION_KEYWORDS
+            for form in (word, word.capitalize(), word.upper()))
+        self._auxiliary_lemmas = frozenset(strings.add(word) for word in _AUXILIARY_LEMMAS)
+
+        # Rule storage, indexed by type and by lowercased subject (positions
+        # in self.rules). The indexes cover the first _indexed_count rules of
+        # the _indexed_rules list and catch up lazily when it is changed directly.
         self.rules: List[Rule] = []
         self.rule_counter = 0
+        self._by_type: Dict[DeonticType, List[Rule]] = {}
+        self._by_subject: Dict[str, List[int]] = {}
+        self._indexed_rules: List[Rule] = self.rules
+        self._indexed_count = 0
+
+        # Bumped, under the lock, whenever rules are stored; extraction alone
+        # changes nothing the stored rules' readers see
+        self._version = 0
+
+        # Rules extracted per sentence text, least recently used first
+        self._sentence_cache: Dict[str, List[Rule]] = {}
+
+        # One extractor is shared by concurrent requests, so the rule counter,
+        # the sentence cache and the rule indexes are only changed under this lock
+        self._lock = threading.RLock()
+
+    @property
+    def version(self) -> int:
+        """Counter that changes whenever rules are stored."""
+        return self._version
 
     def _setup_rule_patterns(self):
-        """Set up spaCy patterns for rule extraction."""
+        """Set up token patterns for rule extraction, written in spaCy Matcher syntax."""
 
         # Obligation patterns (must, shall, will, required)
         obligation_patterns = [
@@ -106,10 +240,56 @@ class RuleExtractor:
             [{"LEMMA": "can"}, {"LEMMA": "not"}, {"POS": "VERB"}],
         ]
 
-        # Add patterns to matcher
-        self.matcher.add("OBLIGATION", obligation_patterns)
-        self.matcher.add("PERMISSION", permission_patterns)
-        self.matcher.add("PROHIBITION", prohibition_patterns)
+        # Compile the patterns into a table keyed by the lemma hash of their
+        # first token. Each entry holds the label hash and, for every later
+        # token, the _TOKEN_ATTRS column it tests and the accepted values.
+        strings = self.nlp.vocab.strings
+        self._first_lemma_to_patterns: Dict[int, List[Tuple[int, Tuple[Tuple[int, frozenset], ...]]]] = {}
+        self._match_id_to_type: Dict[int, DeonticType] = {}
+        for rule_type, patterns in ((DeonticType.OBLIGATION, obligation_patterns),
+                                    (DeonticType.PERMISSION, permission_patterns),
+                                    (DeonticType.PROHIBITION, prohibition_patterns)):
+            match_id = strings.add(rule_type.name)
+            self._match_id_to_type[match_id] = rule_type
+            for pattern in patterns:
+                (first_column, first_values), *rest = map(self._token_test, pattern)
+                assert first_column == _TOKEN_ATTRS.index(LEMMA)
+                for lemma_hash in first_values:
+                    self._first_lemma_to_patterns.setdefault(lemma_hash, []).append((match_id, tuple(rest)))
+
+        # Regex fallback patterns, compiled once per process
+        self._fused_regex = _FUSED_REGEX
+        self._group_to_type = _REGEX_GROUPS
+
+    def _token_test(self, spec: Dict) -> Tuple[int, frozenset]:
+        """Turn a one-attribute Matcher token spec into a (column, accepted values) test."""
+        (attr, value), = spec.items()
+        values = value["IN"] if isinstance(value, dict) else [value]
+        if attr == "LEMMA":
+            return _TOKEN_ATTRS.index(LEMMA), frozenset(self.nlp.vocab.strings.add(v) for v in values)
+        return _TOKEN_ATTRS.index(POS), frozenset(POS_IDS[v] for v in values)
+
+    def _match_deontic(self, columns: Tuple[list, list, list]) -> List[Tuple[int, int, int]]:
+        """
+        Find deontic expressions in a sentence's token columns.
+
+        Only positions whose lemma starts some pattern are tried, and only
+        against those patterns. Returns unique (match_id, start, end) triples
+        ordered like spaCy Matcher output.
+        """
+        lemmas = columns[_TOKEN_ATTRS.index(LEMMA)]
+        n = len(lemmas)
+        matches = {}
+        for start, lemma_hash in enumerate(lemmas):
+            candidates = self._first_lemma_to_patterns.get(lemma_hash)
+            if candidates is None:
+                continue
+            for match_id, rest in candidates:
+                end = start + 1 + len(rest)
+                if end <= n and all(columns[column][start + 1 + offset] in values
+                                    for offset, (column, values) in enumerate(rest)):
+                    matches[match_id, start, end] = None
+        return sorted(matches, key=lambda match: (match[1], match[2]))
 
     def extract_rules(self, text: str, document_name: str = "", section: str = "") -> List[Rule]:
         """
@@ -123,16 +303,32 @@ class RuleExtractor:
         Returns:
             List of extracted rules
         """
-        extracted_rules = []
-        doc = self.nlp(text)
+        return self.extract_rules_from_sections([(section, text)], document_name)
+
+    def extract_rules_from_sections(self, sections: Iterable[Tuple[str, str]],
+                                    document_name: str = "") -> List[Rule]:
+        """
+        Extract rules from a document given as a stream of sections.
+
+        Sections are parsed in batches of ``PIPE_BATCH_SIZE`` with
+        ``nlp.pipe``, so only one batch's parses are held in memory at a
+        time. Sections longer than ``MAX_CHUNK_CHARS`` are first split at
+        blank lines. Duplicates are removed across all sections.
+
+        Args:
+            sections: Iterable of (section title, section text) pairs
+            document_name: Source document name
 
-        # Split text into sentences for better rule extraction
-        sentences = [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 10]
+        Returns:
+            List of extracted rules
+        """
+        extracted_rules = []
 
-        for sentence in sentences:
-            sentence_doc = self.nlp(sentence)
-            rules = self._extract_rules_from_sentence(sentence_doc, document_name, section)
-            extracted_rules.extend(rules)
+        chunks = ((chunk, section) for section, text in sections
+                  for chunk in self._split_into_chunks(text))
+        docs = self.nlp.pipe(chunks, as_tuples=True, batch_size=PIPE_BATCH_SIZE)
+        for doc, section in docs:
+            extracted_rules.extend(self._extract_rules_from_doc(doc, document_name, section))
 
         # Post-process rules to improve quality
         extracted_rules = self._post_process_rules(extracted_rules)
@@ -140,41 +336,157 @@ class RuleExtractor:
         self.logger.info(f"Extracted {len(extracted_rules)} rules from text")
         return extracted_rules
 
+    @staticmethod
+    def _split_into_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+        """
+        Split text at blank lines into chunks of at most ``max_chars``.
+
+        Paragraphs are regrouped greedily and never cut, so a single
+        paragraph longer than the cap becomes a chunk of its own.
+        """
+        if len(text) <= max_chars:
+            return [text]
+
+        chunks = []
+        current = []
+        current_len = 0
+        for paragraph in text.split("\n\n"):
+            if current and current_len + 2 + len(paragraph) > max_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_len = 0
+            current_len += len(paragraph) + (2 if current else 0)
+            current.append(paragraph)
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def extract_rules_batch(self, texts: Iterable[str], document_name: str = "",
+                            document_names: Optional[List[str]] = None) -> List[List[Rule]]:
+        """
+        Extract rules from many independent texts.
+
+        The texts are parsed together with ``nlp.pipe``; duplicates are only
+        removed within each text.
+
+        Args:
+            texts: Input texts to analyze
+            document_name: Source document name
+            document_names: Optional source document name for each text,
+                used instead of ``document_name``
+
+        Returns:
+            One list of extracted rules per text
+        """
+        docs = self.nlp.pipe(texts, batch_size=PIPE_BATCH_SIZE)
+        results = [
+            self._post_process_rules(self._extract_rules_from_doc(
+                doc, document_names[i] if document_names is not None else document_name, ""))
+            for i, doc in enumerate(docs)
+        ]
+
+        self.logger.info(f"Extracted {sum(map(len, results))} rules from {len(results)} texts")
+        return results
+
+    def _extract_rules_from_doc(self, doc, document_name: str, section: str) -> List[Rule]:
+        """Extract rules from every sentence of a parsed text."""
+        rules = []
+
+        # Find the trigger words in one pass over the whole text; only the
+        # sentences holding one are matched
+        triggers = [match.span() for match in _DEONTIC_RE.finditer(doc.text)]
+        if not triggers:
+            return rules
+        next_trigger = 0
+
+        # Sentences are matched as spans of the one parse rather than parsed
+        # again on their own
+        for sent in doc.sents:
+            # Trim whitespace tokens so the span text is the stripped sentence
+            start, end = sent.start, sent.end
+            while start < end and doc[start].is_space:
+                start += 1
+            while end > start and doc[end - 1].is_space:
+                end -= 1
+            sentence = doc[start:end]
+            start_char, end_char = sentence.start_char, sentence.end_char
+
+            while next_trigger < len(triggers) and triggers[next_trigger][0] < start_char:
+                next_trigger += 1
+            if next_trigger == len(triggers):
+                break
+            if end_char - start_char <= 10 or triggers[next_trigger][1] > end_char:
+                continue
+            rules.extend(self._cached_sentence_rules(sentence, document_name, section))
+
+        return rules
+
+    def _cached_sentence_rules(self, sentence, document_name: str, section: str) -> List[Rule]:
+        """
+        Extract rules from a sentence, reusing the result for repeated text.
+
+        A repeated sentence skips matching and component extraction; its
+        cached rules are copied with fresh ids and the current document and
+        section. Returned rules are never the cached objects themselves.
+        """
+        text = sentence.text
+        cache = self._sentence_cache
+        with self._lock:
+            cached = cache.pop(text, None)
+            if cached is not None:
+                cache[text] = cached
+
+        if cached is None:
+            rules = self._extract_rules_from_sentence(sentence, document_name, section)
+            # The cache keeps its own copies, so callers may store or change
+            # the returned rules without affecting later hits
+            cached = [replace(rule) for rule in rules]
+            with self._lock:
+                if text not in cache and len(cache) >= SENTENCE_CACHE_SIZE:
+                    del cache[next(iter(cache))]
+                cache[text] = cached
+            return rules
+
+        rules = []
+        for rule in cached:
+            id_prefix = rule.id[:rule.id.rindex("_") + 1]
+            rules.append(replace(rule, id="%s%04d" % (id_prefix, self._next_rule_number()),
+                                 source_document=document_name, section=section))
+        return rules
+
+    def _next_rule_number(self) -> int:
+        """Advance the rule counter and return its new value."""
+        with self._lock:
+            self.rule_counter += 1
+            return self.rule_counter
+
     def _extract_rules_from_sentence(self, doc, document_name: str, section: str) -> List[Rule]:
-        """Extract rules from a single sentence."""
+        """Extract rules from a single sentence, given as a Doc or Span."""
         rules = []
         sentence_text = doc.text
 
         # Use pattern matching to identify deontic expressions
-        matches = self.matcher(doc)
+        token_attrs = self._token_columns(doc)
+        matches = self._match_deontic(token_attrs)
 
         for match_id, start, end in matches:
-            pattern_label = self.nlp.vocab.strings[match_id]
-            deontic_span = doc[start:end]
-
             # Determine rule type
-            if pattern_label == "OBLIGATION":
-                rule_type = DeonticType.OBLIGATION
-            elif pattern_label == "PERMISSION":
-                rule_type = DeonticType.PERMISSION
-            elif pattern_label == "PROHIBITION":
-                rule_type = DeonticType.PROHIBITION
-            else:
+            rule_type = self._match_id_to_type.get(match_id)
+            if rule_type is None:
                 continue
 
             # Extract rule components
-            rule_components = self._extract_rule_components(doc, start, end)
+            rule_components = self._extract_rule_components(doc, start, end, token_attrs)
 
             if rule_components:
-                self.rule_counter += 1
-                rule_id = f"rule_{self.rule_counter:04d}"
+                rule_id = "rule_%04d" % self._next_rule_number()
 
                 rule = Rule(
                     id=rule_id,
                     rule_type=rule_type,
-                    subject=rule_components.get('subject', ''),
-                    action=rule_components.get('action', ''),
-                    object=rule_components.get('object', ''),
+                    subject=sys.intern(rule_components.get('subject', '')),
+                    action=sys.intern(rule_components.get('action', '')),
+                    object=sys.intern(rule_components.get('object', '')),
                     condition=rule_components.get('condition', ''),
                     text=sentence_text,
                     confidence=self._calculate_rule_confidence(rule_components),
@@ -185,128 +497,104 @@ class RuleExtractor:
 
                 rules.append(rule)
 
-        # Also try regex-based extraction for common patterns
-        regex_rules = self._extract_rules_with_regex(sentence_text, document_name, section)
-        rules.extend(regex_rules)
+        # Fall back to regex-based extraction for common patterns when the
+        # token patterns found no rule in the sentence
+        if not rules:
+            rules = self._extract_rules_with_regex(sentence_text, document_name, section)
 
         return rules
 
-    def _extract_rule_components(self, doc, deontic_start: int, deontic_end: int) -> Optional[Dict[str, str]]:
-        """Extract subject, action, object, and condition from rule."""
+    def _extract_rule_components(self, doc, deontic_start: int, deontic_end: int,
+                                 token_attrs=None) -> Optional[Dict[str, str]]:
+        """
+        Extract subject, action, object, and condition from rule.
+
+        The token scans run over ``token_attrs``, the sentence's POS, IS_STOP
+        and LEMMA columns from ``to_array(_TOKEN_ATTRS)`` (computed if not
+        given), so only the selected tokens are read back from the doc.
+        """
+        if token_attrs is None:
+            token_attrs = self._token_columns(doc)
+        pos, is_stop, lemma = token_attrs
+        n = len(pos)
+
         components = {}
 
         # Find the subject (usually before the deontic expression)
-        subject_candidates = []
-        for token in doc[max(0, deontic_start-10):deontic_start]:
-            if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop:
-                subject_candidates.append(token.text)
-
-        if subject_candidates:
-            components['subject'] = ' '.join(subject_candidates[-2:])  # Take last 1-2 nouns
+        subjects = [i for i in range(max(0, deontic_start - 10), deontic_start)
+                    if pos[i] in _NOUN_POS and not is_stop[i]]
+        if subjects:
+            components['subject'] = ' '.join(doc[i].text for i in subjects[-2:])  # Take last 1-2 nouns
         else:
             components['subject'] = "entity"  # Default subject
 
         # Find the action (verb after deontic expression)
-        action_candidates = []
-        for token in doc[deontic_end:min(len(doc), deontic_end+5)]:
-            if token.pos_ == "VERB":
-                action_candidates.append(token.lemma_)
-                break
-
-        if action_candidates:
-            components['action'] = action_candidates[0]
-        else:
+        action = next((i for i in range(deontic_end, min(n, deontic_end + 5)) if pos[i] == VERB), None)
+        if action is None:
             # Look for action words in the entire sentence
-            for token in doc:
-                if token.pos_ == "VERB" and token.lemma_ not in ["be", "have", "do"]:
-                    components['action'] = token.lemma_
-                    break
-
-        # Find the object (what the action is performed on)
-        object_candidates = []
-        action_found = False
-        for token in doc[deontic_end:]:
-            if token.pos_ == "VERB":
-                action_found = True
-            elif action_found and token.pos_ in ["NOUN", "PROPN"] and not token.is_stop:
-                object_candidates.append(token.text)
-
-        if object_candidates:
-            components['object'] = ' '.join(object_candidates[:3])  # Take first few nouns
-
-        # Look for conditions (if, when, unless, etc.)
-        condition_keywords = ["if", "when", "unless", "provided", "except", "during"]
-        condition_text = ""
-
-        for i, token in enumerate(doc):
-            if token.lemma_.lower() in condition_keywords:
-                # Extract condition from this point to end of sentence
-                condition_tokens = [t.text for t in doc[i:]]
-                condition_text = ' '.join(condition_tokens)
-                break
-
-        components['condition'] = condition_text
+            action = next((i for i in range(n)
+                           if pos[i] == VERB and lemma[i] not in self._auxiliary_lemmas), None)
+        if action is not None:
+            components['action'] = doc[action].lemma_
+
+        # Find the object (what the action is performed on): nouns after the
+        # first verb that follows the deontic expression
+        verb = next((i for i in range(deontic_end, n) if pos[i] == VERB), None)
+        if verb is not None:
+            objects = [i for i in range(verb + 1, n) if pos[i] in _NOUN_POS and not is_stop[i]]
+            if objects:
+                components['object'] = ' '.join(doc[i].text for i in objects[:3])  # Take first few nouns
+
+        # Look for conditions (if, when, unless, etc.) and extract from there
+        # to the end of the sentence
+        condition = next((i for i in range(n) if lemma[i] in self._condition_lemmas), None)
+        components['condition'] = ' '.join(t.text for t in doc[condition:]) if condition is not None else ""
 
         return components if components.get('action') else None
 
+    @staticmethod
+    def _token_columns(doc) -> Tuple[list, list, list]:
+        """POS ids, stop flags and lemma hashes of a sentence, read in one ``to_array`` call."""
+        return tuple(column.tolist() for column in doc.to_array(_TOKEN_ATTRS).T)
+
     def _extract_rules_with_regex(self, text: str, document_name: str, section: str) -> List[Rule]:
         """Extract rules using regex patterns."""
         rules = []
 
-        # Common military rule patterns
-        patterns = [
-            # "Commanders must ensure..."
-            (r'(\w+(?:\s+\w+)*)\s+(must|shall|will)\s+(ensure|verify|confirm)\s+(.+)', DeonticType.OBLIGATION),
-
-            # "Personnel may not..."
-            (r'(\w+(?:\s+\w+)*)\s+(may\s+not|cannot|shall\s+not)\s+(.+)', DeonticType.PROHIBITION),
-
-            # "Units are authorized to..."
-            (r'(\w+(?:\s+\w+)*)\s+(?:are|is)\s+(authorized|permitted|allowed)\s+to\s+(.+)', DeonticType.PERMISSION),
+        # One pass over the fused patterns; lastgroup names the pattern that
+        # matched, whose groups are sliced out of the fused match
+        for match in self._fused_regex.finditer(text):
+            rule_type, first, count = self._group_to_type[match.lastgroup]
+            groups = match.groups()[first:first + count]
+
+            if len(groups) >= 2:
+                rule_id = "rule_regex_%04d" % self._next_rule_number()
+
+                # Extract components based on pattern structure
+                if rule_type == DeonticType.PROHIBITION and "prohibited" in match.group(0):
+                    subject = "entity"
+                    action = groups[-1] if len(groups) >= 1 else ""
+                    object_text = ""
+                else:
+                    subject = groups[0] if len(groups) >= 1 else "entity"
+                    action = groups[-1] if len(groups) >= 2 else ""
+                    object_text = ""
 
-            # "It is prohibited to..."
-            (r'[Ii]t\s+is\s+(prohibited|forbidden)\s+to\s+(.+)', DeonticType.PROHIBITION),
-
-            # "Frequency X must be coordinated..."
-            (r'([Ff]requency\s+\w+)\s+(must|shall)\s+be\s+(.+)', DeonticType.OBLIGATION),
-
-            # "EMS operations require..."
-            (r'(EMS\s+operations?|Electronic\s+warfare)\s+(require|need)\s+(.+)', DeonticType.OBLIGATION),
-        ]
+                rule = Rule(
+                    id=rule_id,
+                    rule_type=rule_type,
+                    subject=sys.intern(subject.strip()),
+                    action=sys.intern(action.strip()),
+                    object=sys.intern(object_text.strip()),
+                    condition="",
+                    text=match.group(0),
+                    confidence=0.7,  # Lower confidence for regex extraction
+                    source_document=document_name,
+                    section=section,
+                    context=text
+                )
 
-        for pattern, rule_type in patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                groups = match.groups()
-
-                if len(groups) >= 2:
-                    self.rule_counter += 1
-                    rule_id = f"rule_regex_{self.rule_counter:04d}"
-
-                    # Extract components based on pattern structure
-                    if rule_type == DeonticType.PROHIBITION and "prohibited" in match.group(0):
-                        subject = "entity"
-                        action = groups[-1] if len(groups) >= 1 else ""
-                        object_text = ""
-                    else:
-                        subject = groups[0] if len(groups) >= 1 else "entity"
-                        action = groups[-1] if len(groups) >= 2 else ""
-                        object_text = ""
-
-                    rule = Rule(
-                        id=rule_id,
-                        rule_type=rule_type,
-                        subject=subject.strip(),
-                        action=action.strip(),
-                        object=object_text.strip(),
-                        condition="",
-                        text=match.group(0),
-                        confidence=0.7,  # Lower confidence for regex extraction
-                        source_document=document_name,
-                        section=section,
-                        context=text
-                    )
-
-                    rules.append(rule)
+                rules.append(rule)
 
         return rules
 
@@ -330,18 +618,20 @@ class RuleExtractor:
 
     def _post_process_rules(self, rules: List[Rule]) -> List[Rule]:
         """Post-process rules to improve quality."""
-        # Remove duplicate rules
-        unique_rules = []
+        # Remove duplicate rules and filter out low-confidence ones in one
+        # pass. A low-confidence rule still claims its signature, so a later
+        # duplicate of it is dropped too.
+        filtered_rules = []
         seen_texts = set()
 
+        # Keyed on the (enum, normalised text) tuple rather than a
+        # concatenated string
         for rule in rules:
-            rule_signature = f"{rule.rule_type.value}_{rule.text.lower().strip()}"
+            rule_signature = (rule.rule_type, rule.text.lower().strip())
             if rule_signature not in seen_texts:
                 seen_texts.add(rule_signature)
-                unique_rules.append(rule)
-
-        # Filter out low-confidence rules
-        filtered_rules = [rule for rule in unique_rules if rule.confidence >= 0.3]
+                if rule.confidence >= 0.3:
+                    filtered_rules.append(rule)
 
         self.logger.info(f"Post-processing: {len(rules)} -> {len(filtered_rules)} rules")
         return filtered_rules
@@ -356,17 +646,94 @@ class RuleExtractor:
         Returns:
             List of detected conflicts
         """
-        conflicts = []
-
-        for i, rule1 in enumerate(rules):
-            for j, rule2 in enumerate(rules[i+1:], i+1):
-                conflict = self._check_rule_conflict(rule1, rule2)
-                if conflict:
-                    conflicts.append(conflict)
+        # An exact field match scores 0.3 or 0.4 and a substring match 0.2 at
+        # most, so a pair with no exactly equal field scores at most
+        # 0.2 + 0.2 + 0.1 = 0.5 and passes neither threshold. Bucket rules on
+        # each lowercased field alone and score only pairs sharing a bucket.
+        buckets: Dict[Tuple[int, str], Dict[DeonticType, List[int]]] = {}
+        for index, rule in enumerate(rules):
+            for key in ((0, rule._subject_lc), (1, rule._action_lc), (2, rule._object_lc)):
+                buckets.setdefault(key, {}).setdefault(rule.rule_type, []).append(index)
+
+        if np is not None and len(rules) >= VECTORIZED_CONFLICT_THRESHOLD:
+            conflicts = self._detect_conflicts_vectorized(rules, buckets)
+        else:
+            found = {}
+            for by_type in buckets.values():
+                prohibitions = by_type.get(DeonticType.PROHIBITION)
+                if not prohibitions:
+                    continue
+
+                for rule_type in (DeonticType.OBLIGATION, DeonticType.PERMISSION):
+                    for i in by_type.get(rule_type, []):
+                        for j in prohibitions:
+                            pair = (min(i, j), max(i, j))
+                            if pair in found:
+                                continue
+                            found[pair] = self._check_rule_conflict(rules[i], rules[j])
+
+            # Report conflicts in document order
+            conflicts = [conflict for _, conflict in sorted(found.items()) if conflict]
 
         self.logger.info(f"Detected {len(conflicts)} rule conflicts")
         return conflicts
 
+    def _detect_conflicts_vectorized(self, rules: List[Rule],
+                                     buckets: Dict[Tuple[int, str], Dict[DeonticType, List[int]]]
+                                     ) -> List[RuleConflict]:
+        """
+        Score the candidate pairs from ``detect_conflicts`` buckets with numpy.
+
+        Each field's contribution to ``_calculate_rule_similarity`` depends
+        only on the two lowercased strings, so it is computed once per
+        distinct pair of strings and gathered for every candidate pair.
+        Only pairs over the threshold are built into conflicts.
+        """
+        # Candidate (obligation or permission, prohibition) pairs
+        firsts, seconds = [], []
+        for by_type in buckets.values():
+            prohibitions = by_type.get(DeonticType.PROHIBITION)
+            if not prohibitions:
+                continue
+            for rule_type in (DeonticType.OBLIGATION, DeonticType.PERMISSION):
+                for i in by_type.get(rule_type, ()):
+                    firsts.extend([i] * len(prohibitions))
+                    seconds.extend(prohibitions)
+        if not firsts:
+            return []
+
+        # One row per pair, in document order
+        first, second = np.array(firsts, dtype=np.int64), np.array(seconds, dtype=np.int64)
+        _, unique = np.unique(np.minimum(first, second) * len(rules) + np.maximum(first, second),
+                              return_index=True)
+        first, second = first[unique], second[unique]
+
+        similarity = np.zeros(len(first))
+        for attribute, exact, partial in (('_subject_lc', 0.3, 0.2),
+                                          ('_action_lc', 0.4, 0.2),
+                                          ('_object_lc', 0.3, 0.1)):
+            vocabulary: Dict[str, int] = {}
+            codes = np.fromiter((vocabulary.setdefault(getattr(rule, attribute), len(vocabulary))
+                                 for rule in rules), dtype=np.int64, count=len(rules))
+            values = list(vocabulary)
+
+            string_pairs, inverse = np.unique(codes[first] * len(values) + codes[second],
+                                              return_inverse=True)
+            scores = np.empty(len(string_pairs))
+            for k, code in enumerate(string_pairs.tolist()):
+                a, b = values[code // len(values)], values[code % len(values)]
+                scores[k] = exact if a == b else (partial if a in b or b in a else 0.0)
+            similarity += scores[inverse]
+
+        # Same thresholds as _check_rule_conflict, packed once per rule and
+        # gathered per pair
+        rule_thresholds = np.fromiter((0.5 if rule.rule_type is DeonticType.OBLIGATION else 0.6
+                                       for rule in rules), dtype=np.float64, count=len(rules))
+        hits = np.flatnonzero(similarity > rule_thresholds[first])
+
+        return [self._check_rule_conflict(rules[i], rules[j])
+                for i, j in zip(first[hits].tolist(), second[hits].tolist())]
+
     def _check_rule_conflict(self, rule1: Rule, rule2: Rule) -> Optional[RuleConflict]:
         """Check if two rules conflict."""
         # Direct contradiction: obligation vs prohibition
@@ -401,62 +768,130 @@ class RuleExtractor:
         return None
 
     def _calculate_rule_similarity(self, rule1: Rule, rule2: Rule) -> float:
-        """Calculate similarity between two rules."""
+        """
+        Calculate similarity between two rules.
+
+        Each field scores its full weight on an exact match and a smaller one
+        when one string contains the other. The conflict thresholds in
+        _check_rule_conflict, and the copy of this scoring in
+        _detect_conflicts_vectorized, rely on these weights.
+        """
         similarity = 0.0
+        subject1, subject2 = rule1._subject_lc, rule2._subject_lc
+        action1, action2 = rule1._action_lc, rule2._action_lc
+        object1, object2 = rule1._object_lc, rule2._object_lc
 
         # Compare subjects
-        if rule1.subject.lower() == rule2.subject.lower():
+        if subject1 == subject2:
             similarity += 0.3
-        elif rule1.subject.lower() in rule2.subject.lower() or rule2.subject.lower() in rule1.subject.lower():
+        elif subject1 in subject2 or subject2 in subject1:
             similarity += 0.2
 
         # Compare actions
-        if rule1.action.lower() == rule2.action.lower():
+        if action1 == action2:
             similarity += 0.4
-        elif rule1.action.lower() in rule2.action.lower() or rule2.action.lower() in rule1.action.lower():
+        elif action1 in action2 or action2 in action1:
             similarity += 0.2
 
         # Compare objects
-        if rule1.object.lower() == rule2.object.lower():
+        if object1 == object2:
             similarity += 0.3
-        elif rule1.object.lower() in rule2.object.lower() or rule2.object.lower() in rule1.object.lower():
+        elif object1 in object2 or object2 in object1:
             similarity += 0.1
 
         return similarity
 
+    def add_rule(self, rule: Rule):
+        """Store a rule and index it by type and subject."""
+        with self._lock:
+            self.rules.append(rule)
+            self._sync_indexes()
+            self._version += 1
+
+    def add_rules(self, rules: Iterable[Rule]):
+        """Store several rules and index them by type and subject."""
+        with self._lock:
+            self.rules.extend(rules)
+            self._sync_indexes()
+            self._version += 1
+
+    def _sync_indexes(self):
+        """Bring the type and subject indexes up to date with self.rules."""
+        with self._lock:
+            rules = self.rules
+            if rules is not self._indexed_rules or len(rules) < self._indexed_count:
+                # Replaced or shrunk from outside: start over
+                self._by_type = {}
+                self._by_subject = {}
+                self._indexed_rules = rules
+                self._indexed_count = 0
+
+            by_type = self._by_type
+            by_subject = self._by_subject
+            for position in range(self._indexed_count, len(rules)):
+                rule = rules[position]
+                by_type.setdefault(rule.rule_type, []).append(rule)
+                by_subject.setdefault(rule._subject_lc, []).append(position)
+            self._indexed_count = len(rules)
+
     def get_rules_by_type(self, rule_type: DeonticType) -> List[Rule]:
         """Get rules filtered by type."""
-        return [rule for rule in self.rules if rule.rule_type == rule_type]
+        self._sync_indexes()
+        return list(self._by_type.get(rule_type, ()))
 
     def get_rules_by_subject(self, subject: str) -> List[Rule]:
         """Get rules filtered by subject."""
-        return [rule for rule in self.rules if subject.lower() in rule.subject.lower()]
+        self._sync_indexes()
+        subject = subject.lower()
+
+        # Substring match against each distinct subject rather than each rule;
+        # positions restore the order of self.rules across subjects
+        positions = sorted(position for key, bucket in self._by_subject.items()
+                           if subject in key for position in bucket)
+        return [self.rules[position] for position in positions]
 
     def export_rules_to_json(self, file_path: str):
         """Export rules to JSON format."""
-        import json
-        from dataclasses import asdict
+        if orjson is not None:
+            # orjson writes the dataclasses directly, rule types by value, and
+            # skips the underscore fields holding the cached lowercase copies
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(self.rules, option=orjson.OPT_INDENT_2))
+        else:
+            import json
 
-        rules_data = []
-        for rule in self.rules:
-            rule_dict = asdict(rule)
-            rule_dict['rule_type'] = rule.rule_type.value
-            rules_data.append(rule_dict)
+            # Public fields only; the cached lowercase copies are not exported
+            names = [f.name for f in fields(Rule) if not f.name.startswith('_')]
+            rules_data = []
+            for rule in self.rules:
+                rule_dict = {name: getattr(rule, name) for name in names}
+                rule_dict['rule_type'] = rule.rule_type.value
+                rules_data.append(rule_dict)
 
-        with open(file_path, 'w') as f:
-            json.dump(rules_data, f, indent=2)
+            with open(file_path, 'w') as f:
+                json.dump(rules_data, f, indent=2)
 
         self.logger.info(f"Exported {len(self.rules)} rules to {file_path}")
 
     def get_statistics(self) -> Dict[str, any]:
         """Get statistics about extracted rules."""
+        # One pass over the rules for every figure
+        counts = {rule_type: 0 for rule_type in DeonticType}
+        confidence_sum = 0
+        documents = set()
+        for rule in self.rules:
+            counts[rule.rule_type] += 1
+            confidence_sum += rule.confidence
+            documents.add(rule.source_document)
+
+        total = len(self.rules)
         stats = {
-            'total_rules': len(self.rules),
-            'obligations': len(self.get_rules_by_type(DeonticType.OBLIGATION)),
-            'permissions': len(self.get_rules_by_type(DeonticType.PERMISSION)),
-            'prohibitions': len(self.get_rules_by_type(DeonticType.PROHIBITION)),
-            'average_confidence': sum(rule.confidence for rule in self.rules) / len(self.rules) if self.rules else 0,
-            'documents_processed': len(set(rule.source_document for rule in self.rules))
+            'total_rules': total,
+            'obligations': counts[DeonticType.OBLIGATION],
+            'permissions': counts[DeonticType.PERMISSION],
+            'prohibitions': counts[DeonticType.PROHIBITION],
+            'average_confidence': confidence_sum / total if total else 0,
+            'documents_processed': len(documents)
         }
 
         return stats
\ No newline at end of file
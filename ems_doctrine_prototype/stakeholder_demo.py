@@ -7,13 +7,10 @@ Professional presentation of capabilities for decision makers and domain experts
 import sys
 import os
 import time
+import argparse
+from collections import Counter, defaultdict
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from ems_doctrine.document_processing import DocumentProcessor
-from ems_doctrine.entity_recognition import EMSEntityRecognizer
-from ems_doctrine.knowledge_graph import KnowledgeGraph
-from ems_doctrine.rule_extraction import RuleExtractor, DeonticType
-
 
 def print_banner(title, subtitle=""):
     """Print a professional banner."""
@@ -43,39 +40,50 @@ def print_metric(label, value, unit=""):
 def print_progress(current, total, task):
     """Print progress indicator."""
     percentage = (current / total) * 100
-    print(f"⏳ Progress: {current}/{total} ({percentage:.0f}%) - {task}")
+    # Flushed, since stdout is not line buffered during the demo
+    print(f"⏳ Progress: {current}/{total} ({percentage:.0f}%) - {task}", flush=True)
 
 
 def demonstrate_use_case(title, doctrine_text, entities, rules):
     """Demonstrate a specific use case."""
     print_section(f"Use Case: {title}", "🎯")
 
-    print(f"Input Doctrine Text:")
-    print(f'"{doctrine_text}"')
-    print()
-
-    print("Extracted Intelligence:")
-    if entities:
-        entity_stats = {}
-        for entity in entities:
-            entity_stats[entity.label] = entity_stats.get(entity.label, 0) + 1
-
-        for entity_type, count in entity_stats.items():
-            print(f"  • {entity_type}: {count} entities")
-
-    if rules:
-        rule_stats = {}
-        for rule in rules:
-            rule_stats[rule.rule_type.value] = rule_stats.get(rule.rule_type.value, 0) + 1
-
-        for rule_type, count in rule_stats.items():
-            print(f"  • {rule_type.title()}s: {count} rules")
+    # Build the whole block and print it in one call
+    lines = ["Input Doctrine Text:", f'"{doctrine_text}"', "", "Extracted Intelligence:"]
+    lines.extend(f"  • {entity_type}: {count} entities"
+                 for entity_type, count in Counter(entity.label for entity in entities).most_common())
+    lines.extend(f"  • {rule_type.title()}s: {count} rules"
+                 for rule_type, count in Counter(rule.rule_type.value for rule in rules).most_common())
+    print("\n".join(lines))
 
     return len(entities), len(rules)
 
 
-def main():
-    """Run stakeholder demonstration."""
+def main(accelerate=False, skip_kg=False, skip_rules=False, use_case=None):
+    """
+    Run stakeholder demonstration.
+
+    Args:
+        accelerate: Run the spaCy models on a GPU when one is available.
+            This pays off with a transformer model such as en_core_web_trf,
+            selected through the ``nlp.spacy_model`` setting.
+        skip_kg: Skip building and querying the knowledge graph
+        skip_rules: Skip rule extraction and the rule analyses
+        use_case: Number (1-3) of the only use case to run; all when None
+    """
+    # Imported here so that importing this module, or running it with
+    # --help, does not pull in spaCy
+    import spacy
+    from ems_doctrine._democache import cached_nlp
+    from ems_doctrine.entity_recognition import EMSEntityRecognizer
+    from ems_doctrine.knowledge_graph import KnowledgeGraph
+    from ems_doctrine.rule_extraction import RuleExtractor, DeonticType
+
+    # Write the report in blocks rather than flushing every line to the
+    # terminal; only progress lines are flushed as they happen
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=False)
+
     print_banner(
         "AIR FORCE EMS DOCTRINE DIGITIZATION",
         "Phase 0 Prototype Demonstration for Stakeholders"
@@ -104,14 +112,29 @@ DEMONSTRATION SCOPE:
 
     # Initialize system
     print_section("System Initialization", "⚙️")
+    if accelerate:
+        # Must run before any model is loaded; falls back to the CPU
+        if spacy.prefer_gpu():
+            print_highlight("GPU acceleration enabled for spaCy models")
+        else:
+            print_highlight("No GPU available - running spaCy models on CPU")
+
     print_progress(1, 4, "Loading NLP models...")
     entity_recognizer = EMSEntityRecognizer()
 
-    print_progress(2, 4, "Initializing rule extraction engine...")
-    rule_extractor = RuleExtractor()
+    if skip_rules:
+        print_progress(2, 4, "Skipping rule extraction engine")
+        rule_extractor = None
+    else:
+        print_progress(2, 4, "Initializing rule extraction engine...")
+        rule_extractor = RuleExtractor()
 
-    print_progress(3, 4, "Setting up knowledge graph...")
-    knowledge_graph = KnowledgeGraph(":memory:")
+    if skip_kg:
+        print_progress(3, 4, "Skipping knowledge graph")
+        knowledge_graph = None
+    else:
+        print_progress(3, 4, "Setting up knowledge graph...")
+        knowledge_graph = KnowledgeGraph(":memory:")
 
     print_progress(4, 4, "System ready for demonstration")
     print_highlight("All systems operational - Ready for doctrine analysis")
@@ -129,18 +152,6 @@ DEMONSTRATION SCOPE:
     transmitting on guard frequencies (121.5 MHz and 243 MHz) except during actual emergencies.
     """
 
-    entities_1 = entity_recognizer.extract_entities(doctrine_1)
-    rules_1 = rule_extractor.extract_rules(doctrine_1, "use_case_1")
-
-    e_count, r_count = demonstrate_use_case(
-        "Frequency Coordination Authority",
-        doctrine_1.strip(),
-        entities_1,
-        rules_1
-    )
-    total_entities += e_count
-    total_rules += r_count
-
     # Use Case 2: Equipment Authorization
     doctrine_2 = """
     Radar systems operating in the X-band (8-12 GHz) require coordination with airspace
@@ -149,18 +160,6 @@ DEMONSTRATION SCOPE:
     electromagnetic compatibility with friendly forces before activation.
     """
 
-    entities_2 = entity_recognizer.extract_entities(doctrine_2)
-    rules_2 = rule_extractor.extract_rules(doctrine_2, "use_case_2")
-
-    e_count, r_count = demonstrate_use_case(
-        "Equipment Authorization and Coordination",
-        doctrine_2.strip(),
-        entities_2,
-        rules_2
-    )
-    total_entities += e_count
-    total_rules += r_count
-
     # Use Case 3: Emergency Procedures
     doctrine_3 = """
     During troops in contact (TIC) situations, aircraft may deviate from standard frequency
@@ -169,82 +168,99 @@ DEMONSTRATION SCOPE:
     upon detection of friendly forces in the target area.
     """
 
-    entities_3 = entity_recognizer.extract_entities(doctrine_3)
-    rules_3 = rule_extractor.extract_rules(doctrine_3, "use_case_3")
-
-    e_count, r_count = demonstrate_use_case(
-        "Emergency Procedures and Exceptions",
-        doctrine_3.strip(),
-        entities_3,
-        rules_3
-    )
-    total_entities += e_count
-    total_rules += r_count
-
-    # Aggregate all data for knowledge graph
-    all_entities = entities_1 + entities_2 + entities_3
-    all_rules = rules_1 + rules_2 + rules_3
-
-    # Build knowledge graph
-    print_section("Knowledge Graph Construction", "🕸️")
-    knowledge_graph.add_entities_from_document(all_entities, "stakeholder_demo")
-
-    # Extract relationships
-    all_text = doctrine_1 + doctrine_2 + doctrine_3
-    relationships = entity_recognizer.extract_relationships(all_text, all_entities)
-    knowledge_graph.add_relationships_from_data(relationships, "stakeholder_demo")
-
-    kg_stats = knowledge_graph.get_statistics()
-    print_metric("Total Entities", kg_stats['total_nodes'])
-    print_metric("Relationships", kg_stats['total_edges'])
-    print_metric("Entity Types", len(kg_stats['node_types']))
-
-    print("\nEntity Type Distribution:")
-    for entity_type, count in kg_stats['node_types'].items():
-        print(f"  • {entity_type}: {count}")
+    use_cases = [
+        ("Frequency Coordination Authority", "use_case_1", doctrine_1),
+        ("Equipment Authorization and Coordination", "use_case_2", doctrine_2),
+        ("Emergency Procedures and Exceptions", "use_case_3", doctrine_3),
+    ]
+    if use_case is not None:
+        use_cases = [use_cases[use_case - 1]]
+
+    # Run the three passages through each spaCy pipeline in one batched
+    # pass, or reuse the results of an earlier demo run, then present and
+    # aggregate them use case by use case
+    results = cached_nlp([text for _, _, text in use_cases], entity_recognizer, rule_extractor,
+                         document_names=[name for _, name, _ in use_cases])
+
+    all_entities = []
+    all_rules = []
+    for (title, _, doctrine_text), (entities, rules) in zip(use_cases, results):
+        e_count, r_count = demonstrate_use_case(title, doctrine_text.strip(), entities, rules)
+        total_entities += e_count
+        total_rules += r_count
+        all_entities.extend(entities)
+        all_rules.extend(rules)
+
+    if not skip_kg:
+        # Build knowledge graph
+        print_section("Knowledge Graph Construction", "🕸️")
+        knowledge_graph.add_entities_from_document(all_entities, "stakeholder_demo")
+
+        # Extract relationships
+        all_text = "".join(doctrine_text for _, _, doctrine_text in use_cases)
+        relationships = entity_recognizer.extract_relationships(all_text, all_entities)
+        knowledge_graph.add_relationships_from_data(relationships, "stakeholder_demo")
+
+        kg_stats = knowledge_graph.get_statistics()
+        print_metric("Total Entities", kg_stats['total_nodes'])
+        print_metric("Relationships", kg_stats['total_edges'])
+        print_metric("Entity Types", len(kg_stats['node_types']))
+
+        print("\nEntity Type Distribution:")
+        for entity_type, count in kg_stats['node_types'].items():
+            print(f"  • {entity_type}: {count}")
 
     # Demonstrate automated analysis capabilities
     print_section("Automated Analysis Capabilities", "🔬")
 
-    # 1. Conflict Detection
-    print("1. RULE CONFLICT DETECTION")
-    conflicts = rule_extractor.detect_conflicts(all_rules)
-    if conflicts:
-        print(f"⚠️  Detected {len(conflicts)} potential doctrine conflicts:")
-        for i, conflict in enumerate(conflicts[:3], 1):
-            print(f"   {i}. {conflict.conflict_type}: {conflict.description}")
-    else:
-        print("✅ No conflicting rules detected in sample doctrine")
-
-    # 2. Compliance Queries
-    print("\n2. SEMANTIC QUERIES")
-    frequency_nodes = knowledge_graph.query_nodes(node_type="FREQUENCY")
-    authority_nodes = knowledge_graph.query_nodes(node_type="AUTHORITY")
-
-    print(f"   Query: 'Show all frequency entities'")
-    print(f"   Result: {len(frequency_nodes)} frequency references found")
-    for node in frequency_nodes[:3]:
-        print(f"     • {node.label}")
-
-    print(f"   Query: 'Show all command authorities'")
-    print(f"   Result: {len(authority_nodes)} authority entities found")
-    for node in authority_nodes:
-        print(f"     • {node.label}")
+    if not skip_rules:
+        # 1. Conflict Detection
+        print("1. RULE CONFLICT DETECTION")
+        conflicts = rule_extractor.detect_conflicts(all_rules)
+        if conflicts:
+            print(f"⚠️  Detected {len(conflicts)} potential doctrine conflicts:")
+            for i, conflict in enumerate(conflicts[:3], 1):
+                print(f"   {i}. {conflict.conflict_type}: {conflict.description}")
+        else:
+            print("✅ No conflicting rules detected in sample doctrine")
+
+    if not skip_kg:
+        # 2. Compliance Queries
+        print("\n2. SEMANTIC QUERIES")
+        frequency_nodes = knowledge_graph.query_nodes(node_type="FREQUENCY")
+        authority_nodes = knowledge_graph.query_nodes(node_type="AUTHORITY")
+
+        print(f"   Query: 'Show all frequency entities'")
+        print(f"   Result: {len(frequency_nodes)} frequency references found")
+        for node in frequency_nodes[:3]:
+            print(f"     • {node.label}")
+
+        print(f"   Query: 'Show all command authorities'")
+        print(f"   Result: {len(authority_nodes)} authority entities found")
+        for node in authority_nodes:
+            print(f"     • {node.label}")
 
     # 3. Deontic Logic Analysis
-    print("\n3. DEONTIC LOGIC ANALYSIS")
-    obligations = [r for r in all_rules if r.rule_type == DeonticType.OBLIGATION]
-    permissions = [r for r in all_rules if r.rule_type == DeonticType.PERMISSION]
-    prohibitions = [r for r in all_rules if r.rule_type == DeonticType.PROHIBITION]
-
-    print(f"   Obligations (MUST): {len(obligations)} rules")
-    print(f"   Permissions (MAY): {len(permissions)} rules")
-    print(f"   Prohibitions (MUST NOT): {len(prohibitions)} rules")
-
-    if obligations:
-        print(f"   Example obligation: '{obligations[0].text[:80]}...'")
-    if prohibitions:
-        print(f"   Example prohibition: '{prohibitions[0].text[:80]}...'")
+    # Partition by type and total the confidence in one pass
+    buckets = defaultdict(list)
+    confidence_sum = 0.0
+    for r in all_rules:
+        buckets[r.rule_type].append(r)
+        confidence_sum += r.confidence
+    obligations = buckets[DeonticType.OBLIGATION]
+    permissions = buckets[DeonticType.PERMISSION]
+    prohibitions = buckets[DeonticType.PROHIBITION]
+
+    if not skip_rules:
+        print("\n3. DEONTIC LOGIC ANALYSIS")
+        print(f"   Obligations (MUST): {len(obligations)} rules")
+        print(f"   Permissions (MAY): {len(permissions)} rules")
+        print(f"   Prohibitions (MUST NOT): {len(prohibitions)} rules")
+
+        if obligations:
+            print(f"   Example obligation: '{obligations[0].text[:80]}...'")
+        if prohibitions:
+            print(f"   Example prohibition: '{prohibitions[0].text[:80]}...'")
 
     # Performance Metrics
     print_section("Performance Metrics", "⚡")
@@ -254,7 +270,7 @@ DEMONSTRATION SCOPE:
     print_metric("Total Entities Processed", total_entities)
     print_metric("Total Rules Extracted", total_rules)
 
-    avg_confidence = sum(r.confidence for r in all_rules) / len(all_rules) if all_rules else 0
+    avg_confidence = confidence_sum / len(all_rules) if all_rules else 0
     print_metric("Average Rule Confidence", f"{avg_confidence:.1f}", "%")
 
     # Value Proposition
@@ -340,4 +356,15 @@ operations in the digital age.
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accelerate", action="store_true",
+                        help="run the spaCy models on a GPU when one is available")
+    parser.add_argument("--skip-kg", action="store_true",
+                        help="skip building and querying the knowledge graph")
+    parser.add_argument("--skip-rules", action="store_true",
+                        help="skip rule extraction and the rule analyses")
+    parser.add_argument("--use-case", type=int, choices=[1, 2, 3], metavar="N",
+                        help="run only use case N (1-3)")
+    args = parser.parse_args()
+    main(accelerate=args.accelerate, skip_kg=args.skip_kg,
+         skip_rules=args.skip_rules, use_case=args.use_case)
\ No newline at end of file
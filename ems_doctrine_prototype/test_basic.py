@@ -5,145 +5,460 @@ Basic functionality test for EMS Doctrine Prototype
 
 import sys
 import os
+import functools
+import random
+import sqlite3
+
+import pytest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Imported once here; test_imports reports whether this succeeded
+try:
+    from ems_doctrine.config import config
+    from ems_doctrine.document_processing import DocumentProcessor
+    from ems_doctrine import entity_recognition
+    from ems_doctrine.entity_recognition import EMSEntityRecognizer
+    from ems_doctrine.knowledge_graph import KnowledgeGraph, Node, Edge
+    from ems_doctrine import rule_extraction
+    from ems_doctrine.rule_extraction import RuleExtractor, Rule, DeonticType, _DEONTIC_RE
+    IMPORT_OK = True
+    IMPORT_ERROR = None
+except ImportError as e:
+    IMPORT_OK = False
+    IMPORT_ERROR = e
+
+
+@functools.lru_cache(maxsize=1)
+def _get_recognizer():
+    """Load the entity recognizer once for all tests."""
+    return EMSEntityRecognizer()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_rule_extractor():
+    """Load the rule extractor once for all tests."""
+    return RuleExtractor()
+
+
+def _rule_extractor_or_skip():
+    """Shared rule extractor, skipping the test when no spaCy model is installed."""
+    try:
+        return _get_rule_extractor()
+    except OSError as e:
+        pytest.skip(f"spaCy model not available: {e}")
+
+
 def test_imports():
     """Test that all modules can be imported."""
-    try:
-        from ems_doctrine.config import config
-        from ems_doctrine.document_processing import DocumentProcessor
-        from ems_doctrine.entity_recognition import EMSEntityRecognizer
-        from ems_doctrine.knowledge_graph import KnowledgeGraph
-        from ems_doctrine.rule_extraction import RuleExtractor
-        print("✅ All modules imported successfully")
-        return True
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
-        return False
+    assert IMPORT_OK, f"Import error: {IMPORT_ERROR}"
+    print("✅ All modules imported successfully")
 
 
 def test_entity_recognition():
     """Test entity recognition functionality."""
-    try:
-        from ems_doctrine.entity_recognition import EMSEntityRecognizer
+    recognizer = _get_recognizer()
+    test_text = "JFACC must coordinate EMS operations on UHF frequencies"
+    entities = recognizer.extract_entities(test_text)
 
-        recognizer = EMSEntityRecognizer()
-        test_text = "JFACC must coordinate EMS operations on UHF frequencies"
-        entities = recognizer.extract_entities(test_text)
+    assert len(entities) > 0, "No entities extracted"
 
-        assert len(entities) > 0, "No entities extracted"
+    # Check for expected entity types
+    entity_types = [e.label for e in entities]
+    expected_types = ['AUTHORITY', 'EMS_OPERATION', 'FREQUENCY']
 
-        # Check for expected entity types
-        entity_types = [e.label for e in entities]
-        expected_types = ['AUTHORITY', 'EMS_OPERATION', 'FREQUENCY']
+    entity_types_set = set(entity_types)
+    found_types = [t for t in expected_types if t in entity_types_set]
+    assert found_types, f"None of the expected entity types {expected_types} found"
 
-        found_types = [t for t in expected_types if any(t in entity_types for t in entity_types)]
-
-        print(f"✅ Entity recognition working: {len(entities)} entities found")
-        print(f"   Types found: {set(entity_types)}")
-        return True
-
-    except Exception as e:
-        print(f"❌ Entity recognition error: {e}")
-        return False
+    print(f"✅ Entity recognition working: {len(entities)} entities found")
+    print(f"   Types found: {set(entity_types)}")
 
 
 def test_rule_extraction():
     """Test rule extraction functionality."""
-    try:
-        from ems_doctrine.rule_extraction import RuleExtractor, DeonticType
+    extractor = _rule_extractor_or_skip()
+    test_text = "Commanders must ensure frequency coordination. Units may transmit on designated frequencies."
+    rules = extractor.extract_rules(test_text, "test")
 
-        extractor = RuleExtractor()
-        test_text = "Commanders must ensure frequency coordination. Units may transmit on designated frequencies."
-        rules = extractor.extract_rules(test_text, "test")
+    assert len(rules) > 0, "No rules extracted"
 
-        assert len(rules) > 0, "No rules extracted"
+    # Check rule types
+    rule_types = [r.rule_type for r in rules]
+    assert DeonticType.OBLIGATION in rule_types or DeonticType.PERMISSION in rule_types
 
-        # Check rule types
-        rule_types = [r.rule_type for r in rules]
-        assert DeonticType.OBLIGATION in rule_types or DeonticType.PERMISSION in rule_types
-
-        print(f"✅ Rule extraction working: {len(rules)} rules found")
-        for rule in rules:
-            print(f"   {rule.rule_type.value}: {rule.subject} {rule.action}")
-        return True
-
-    except Exception as e:
-        print(f"❌ Rule extraction error: {e}")
-        return False
+    print(f"✅ Rule extraction working: {len(rules)} rules found")
+    for rule in rules:
+        print(f"   {rule.rule_type.value}: {rule.subject} {rule.action}")
 
 
 def test_knowledge_graph():
     """Test knowledge graph functionality."""
-    try:
-        from ems_doctrine.knowledge_graph import KnowledgeGraph, Node
-        import tempfile
-        import os
+    # The graph keeps a single connection open, so an in-memory database
+    # lives for the whole test
+    kg = KnowledgeGraph(":memory:")
 
-        # Use a temporary file for testing instead of in-memory
-        temp_db = tempfile.mktemp(suffix='.db')
+    # Test adding a node
+    test_node = Node(
+        id="test_node",
+        label="Test Entity",
+        type="TEST",
+        properties={"test": "value"},
+        source_document="test_doc"
+    )
 
-        try:
-            kg = KnowledgeGraph(temp_db)
-
-            # Test adding a node
-            test_node = Node(
-                id="test_node",
-                label="Test Entity",
-                type="TEST",
-                properties={"test": "value"},
-                source_document="test_doc"
+    result = kg.add_node(test_node)
+    assert result == True, "Failed to add node"
+
+    # Test querying
+    nodes = kg.query_nodes(node_type="TEST")
+    assert len(nodes) == 1, "Failed to query nodes"
+
+    stats = kg.get_statistics()
+    assert stats['total_nodes'] >= 1, "Statistics not working"
+
+    print("✅ Knowledge graph working: nodes can be added and queried")
+
+
+def test_configuration():
+    """Test configuration system."""
+    # Test basic config access
+    project_name = config.project_name
+    version = config.version
+
+    assert project_name is not None, "Project name not configured"
+    assert version is not None, "Version not configured"
+
+    # Test domain-specific config
+    freq_bands = config.frequency_bands
+    equipment_types = config.equipment_types
+
+    assert len(freq_bands) > 0, "Frequency bands not configured"
+    assert len(equipment_types) > 0, "Equipment types not configured"
+
+    print("✅ Configuration system working")
+    print(f"   Project: {project_name} v{version}")
+    print(f"   EMS Domain: {len(freq_bands)} frequency bands, {len(equipment_types)} equipment types")
+
+
+def _entity_spans(entities):
+    """Reduce entities to comparable (label, start, end) triples."""
+    return [(e.label, e.start, e.end) for e in entities]
+
+
+def test_lazy_entities_match_spacy_tokenization(monkeypatch):
+    """Lazy regex matching finds the same entities as the spaCy matchers over English()."""
+    def missing_model(*args, **kwargs):
+        raise OSError("model not loaded in this test")
+
+    monkeypatch.setattr(entity_recognition.spacy, "load", missing_model)
+    spacy_recognizer = EMSEntityRecognizer()
+    lazy_recognizer = EMSEntityRecognizer(lazy=True)
+
+    texts = ["2.4GHz, hz", "30. hz", "30.5. hz", "1,000, MHz", "PRC-117 radios on 30-88 MHz",
+             "JFACC must coordinate EMS operations on UHF frequencies"]
+    rng = random.Random(3)
+    words = ["2.4GHz", "30", "30.", "hz", "Hz", "MHz", "ghz", "kHz.", "3.5-ghz", "PRC-117", "(", ")",
+             "UHF", "radar", "jammer", "30-88", "1,000", "2.4", "a.", "JFACC", "1_0", "9a"]
+    for _ in range(500):
+        texts.append("".join(rng.choice(words) + rng.choice([" ", ", ", ". "])
+                             for _ in range(rng.randint(2, 7))).strip())
+
+    for text in texts:
+        assert (_entity_spans(lazy_recognizer.extract_entities(text))
+                == _entity_spans(spacy_recognizer.extract_entities(text))), text
+
+
+def test_demo_cache_key_covers_recognizer():
+    """Demo cache entries are keyed on the recognizer's mode and dictionary terms."""
+    from ems_doctrine import _democache
+
+    lazy_recognizer = EMSEntityRecognizer(lazy=True)
+    extended_recognizer = EMSEntityRecognizer(lazy=True)
+    extended_recognizer.equipment_types = [*extended_recognizer.equipment_types, "decoy_emitter"]
+
+    def key(recognizer):
+        return _democache._cache_path(["Units must not jam."], ["doc"], recognizer, True)
+
+    assert key(lazy_recognizer) == key(EMSEntityRecognizer(lazy=True))
+    assert len({key(lazy_recognizer), key(extended_recognizer), key(_get_recognizer())}) == 3
+
+
+@pytest.fixture
+def rule_extractor():
+    """Shared rule extractor, skipping the test when no spaCy model is installed."""
+    return _rule_extractor_or_skip()
+
+
+def _make_rule(rule_id, rule_type, subject, action, object_text=""):
+    """Build a bare rule with the fields conflict detection reads."""
+    return Rule(rule_id, rule_type, subject, action, object_text, "", "", 0.8, "test", "", "")
+
+
+@pytest.mark.parametrize("threshold", [10 ** 9, 0])
+def test_detect_conflicts_substring_fields(rule_extractor, monkeypatch, threshold):
+    """Pairs matching on contained rather than equal fields are still reported."""
+    monkeypatch.setattr(rule_extraction, "VECTORIZED_CONFLICT_THRESHOLD", threshold)
+    rules = [
+        _make_rule("r1", DeonticType.OBLIGATION, "Units", "jam", "radars"),
+        _make_rule("r2", DeonticType.PROHIBITION, "Units", "transmit or jam radars.", ""),
+    ]
+    conflicts = rule_extractor.detect_conflicts(rules)
+    assert [(c.rule1_id, c.rule2_id) for c in conflicts] == [("r1", "r2")]
+
+
+def _pairwise_conflicts(extractor, rules):
+    """Reference result: score every pair of rules in both directions."""
+    found = []
+    for i, first in enumerate(rules):
+        for second in rules[i + 1:]:
+            conflict = (extractor._check_rule_conflict(first, second)
+                        or extractor._check_rule_conflict(second, first))
+            if conflict:
+                found.append((conflict.rule1_id, conflict.rule2_id))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("threshold", [10 ** 9, 0])
+def test_detect_conflicts_matches_pairwise_scan(rule_extractor, monkeypatch, threshold):
+    """Bucketed detection finds the same conflicts as scoring every pair."""
+    monkeypatch.setattr(rule_extraction, "VECTORIZED_CONFLICT_THRESHOLD", threshold)
+    rng = random.Random(7)
+    subjects = ["Units", "units", "All units", "Commanders", "EWOs", "JFACC", ""]
+    actions = ["jam", "jamming", "transmit", "retransmit", "transmit or jam radars.",
+               "transmit on guard frequencies.", "coordinate", "coordinate with JFACC", ""]
+    objects = ["", "radars", "enemy radars", "guard frequencies", "frequencies"]
+    rules = [_make_rule(f"r{i}", rng.choice(list(DeonticType)), rng.choice(subjects),
+                        rng.choice(actions), rng.choice(objects))
+             for i in range(300)]
+
+    found = sorted((c.rule1_id, c.rule2_id) for c in rule_extractor.detect_conflicts(rules))
+    assert found == _pairwise_conflicts(rule_extractor, rules)
+
+
+def test_concurrent_extraction_issues_unique_ids(rule_extractor):
+    """Threads sharing one extractor never hand out the same rule id."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    texts = ["Units must coordinate jamming with the JFACC. Units may transmit on guard frequencies."] * 40
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        batches = list(executor.map(lambda text: rule_extractor.extract_rules(text, "test"), texts))
+
+    ids = [rule.id for rules in batches for rule in rules]
+    assert ids and len(ids) == len(set(ids))
+    assert len({len(rules) for rules in batches}) == 1
+
+
+def _small_graph():
+    """Graph a -> b -> c, a -> c, c -> a, plus an isolated node d."""
+    kg = KnowledgeGraph(":memory:")
+    for node_id in "abcd":
+        kg.add_node(Node(id=node_id, label=node_id.upper(), type="U" if node_id == "d" else "T",
+                         properties={}))
+    for source, target, relationship in [("a", "b", "X"), ("b", "c", "X"), ("a", "c", "Y"), ("c", "a", "Z")]:
+        kg.add_edge(Edge(source=source, target=target, relationship=relationship, properties={}))
+    return kg
+
+
+def test_knowledge_graph_queries():
+    """Paths, neighbours and statistics on a small graph."""
+    kg = _small_graph()
+
+    assert sorted(kg.find_paths("a", "c")) == [["a", "b", "c"], ["a", "c"]]
+    assert kg.find_paths("a", "c", max_length=1) == [["a", "c"]]
+    assert kg.find_paths("a", "d") == []
+    assert kg.find_paths("a", "missing") == []
+
+    assert kg.get_neighbors("c") == ["a", "b"]
+    assert kg.get_neighbors("a", "X") == ["b"]
+    assert kg.get_neighbors("d") == []
+
+    assert kg.get_statistics() == {
+        'total_nodes': 4,
+        'total_edges': 4,
+        'node_types': {'T': 3, 'U': 1},
+        'edge_types': {'X': 2, 'Y': 1, 'Z': 1},
+        'is_connected': False,
+        'number_of_components': 2
+    }
+
+
+def test_migrate_node_columns(tmp_path):
+    """Entity fields stored in an older database's properties move to their columns."""
+    db_path = tmp_path / "old.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE nodes (
+                id TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                type TEXT NOT NULL,
+                properties TEXT,
+                source_document TEXT,
+                confidence REAL DEFAULT 1.0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
+        """)
+        conn.execute("INSERT INTO nodes (id, label, type, properties, source_document) VALUES (?, ?, ?, ?, ?)",
+                     ("n1", "UHF", "FREQUENCY",
+                      '{"original_text": "UHF", "context": "on UHF bands", "start_pos": 3, '
+                      '"end_pos": 6, "band": "300 MHz"}', "doc"))
+    conn.close()
+
+    kg = KnowledgeGraph(str(db_path))
+    try:
+        [node] = kg.query_nodes(properties={"original_text": "UHF"})
+        assert (node.original_text, node.context, node.start_pos, node.end_pos) == ("UHF", "on UHF bands", 3, 6)
+        assert node.properties == {"band": "300 MHz"}
+    finally:
+        kg.close()
 
-            result = kg.add_node(test_node)
-            assert result == True, "Failed to add node"
 
-            # Test querying
-            nodes = kg.query_nodes(node_type="TEST")
-            assert len(nodes) == 1, "Failed to query nodes"
+def test_deontic_prefilter_admits_contractions():
+    """Sentences with contracted modals reach the token patterns."""
+    for sentence in ["Units shan't transmit on guard frequencies.", "Units shan’t jam.",
+                     "Units can't jam.", "Units'll coordinate with the JFACC."]:
+        assert _DEONTIC_RE.search(sentence), sentence
+    assert not _DEONTIC_RE.search("Units in the shanty town transmit.")
 
-            stats = kg.get_statistics()
-            assert stats['total_nodes'] >= 1, "Statistics not working"
 
-            print("✅ Knowledge graph working: nodes can be added and queried")
-            return True
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_db):
-                os.remove(temp_db)
+def test_shant_prohibition(rule_extractor):
+    """The contraction "shan't" is matched by the shall-not prohibition pattern."""
+    rules = rule_extractor.extract_rules("Units shan't transmit on guard frequencies.", "test")
+    assert DeonticType.PROHIBITION in {rule.rule_type for rule in rules}
 
-    except Exception as e:
-        print(f"❌ Knowledge graph error: {e}")
-        return False
 
+def test_sentence_cache_does_not_share_rules():
+    """Changing an extracted rule does not leak into later extractions of the same sentence."""
+    _rule_extractor_or_skip()
+    extractor = RuleExtractor()
+    text = "Units must not transmit on guard frequencies."
+
+    [first] = extractor.extract_rules(text, "test")
+    extractor.add_rules([first])
+    first.subject = "changed"
+    first.confidence = 0.0
+
+    [second] = extractor.extract_rules(text, "test")
+    assert second is not first
+    assert second.subject != "changed" and second.confidence > 0.0
+
+
+def test_rule_version_tracks_stored_rules():
+    """Extraction leaves the rule version alone; storing rules changes it."""
+    _rule_extractor_or_skip()
+    extractor = RuleExtractor()  # fresh, so the shared extractor stores no rules
+    version = extractor.version
+
+    rules = extractor.extract_rules("Units must not transmit on guard frequencies.", "test")
+    extractor.extract_rules_batch(["Units may transmit on designated frequencies."])
+    assert extractor.version == version
+
+    extractor.add_rules(rules)
+    assert extractor.version != version
+
+
+def test_bulk_add_rollback_leaves_graph_unchanged():
+    """A failed bulk insert adds nothing to either the database or the loaded graph."""
+    kg = KnowledgeGraph(":memory:")
+    assert kg.graph.number_of_nodes() == 0  # load the in-memory graph
+    version = kg.version
+
+    with pytest.raises(TypeError):
+        kg.add_entities_bulk({"TEST": [{"id": "a", "label": "A"},
+                                       {"id": "b", "label": "B", "properties": {"bad": object()}}]})
+
+    assert list(kg.graph.nodes) == []
+    assert kg.get_statistics()['total_nodes'] == 0
+    assert kg.version == version
+
+    assert kg.add_entities_bulk({"TEST": [{"id": "a", "label": "A"}, {"id": "b", "label": "B"}]}) == 2
+    assert sorted(kg.graph.nodes) == ["a", "b"]
+    assert kg.add_relationships_bulk({"LINKS": [{"source": "a", "target": "b"},
+                                                {"source": "a", "target": "missing"}]}) == 1
+    assert list(kg.graph.edges(keys=True)) == [("a", "b", "LINKS")]
+
+
+@pytest.fixture
+def kg_client(monkeypatch):
+    """Flask test client serving the small in-memory graph."""
+    from ems_doctrine import api
+
+    knowledge_graph = _small_graph()
+    monkeypatch.setattr(api, "get_knowledge_graph", lambda: knowledge_graph)
+    monkeypatch.setattr(api, "_query_cache", {})
+    return api.app.test_client()
+
+
+@pytest.fixture
+def api_client(kg_client, monkeypatch):
+    """Flask test client with an empty rule extractor and the small in-memory graph."""
+    from ems_doctrine import api
 
-def test_configuration():
-    """Test configuration system."""
     try:
-        from ems_doctrine.config import config
+        rule_extractor = RuleExtractor()
+    except OSError as e:
+        pytest.skip(f"spaCy model not available: {e}")
+    monkeypatch.setattr(api, "get_rule_extractor", lambda: rule_extractor)
+    return kg_client
 
-        # Test basic config access
-        project_name = config.project_name
-        version = config.version
 
-        assert project_name is not None, "Project name not configured"
-        assert version is not None, "Version not configured"
+def test_query_nodes_pagination(kg_client):
+    """/knowledge_graph/nodes slices the matching nodes with limit and offset."""
+    response = kg_client.get('/knowledge_graph/nodes?type=T&offset=1&limit=1')
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [node['id'] for node in payload['nodes']] == ["b"]
+    assert (payload['total'], payload['offset'], payload['limit']) == (3, 1, 1)
 
-        # Test domain-specific config
-        freq_bands = config.frequency_bands
-        equipment_types = config.equipment_types
+    payload = kg_client.get('/knowledge_graph/nodes?offset=2').get_json()
+    assert [node['id'] for node in payload['nodes']] == ["c", "d"]
+    assert payload['limit'] is None
 
-        assert len(freq_bands) > 0, "Frequency bands not configured"
-        assert len(equipment_types) > 0, "Equipment types not configured"
 
-        print("✅ Configuration system working")
-        print(f"   Project: {project_name} v{version}")
-        print(f"   EMS Domain: {len(freq_bands)} frequency bands, {len(equipment_types)} equipment types")
-        return True
+def test_statistics_not_modified(kg_client, monkeypatch):
+    """A matching If-None-Match gets 304 until the graph changes, without loading the rule extractor."""
+    from ems_doctrine import api
 
-    except Exception as e:
-        print(f"❌ Configuration error: {e}")
-        return False
+    def no_rule_extractor():
+        pytest.fail("graph statistics loaded the rule extractor")
+
+    monkeypatch.setattr(api, "get_rule_extractor", no_rule_extractor)
+    response = kg_client.get('/knowledge_graph/statistics')
+    assert response.status_code == 200
+    assert response.get_json()['total_nodes'] == 4
+    etag = response.headers['ETag']
+
+    response = kg_client.get('/knowledge_graph/statistics', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+    api.get_knowledge_graph().add_node(Node(id="e", label="E", type="T", properties={}))
+    response = kg_client.get('/knowledge_graph/statistics', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['total_nodes'] == 5
+
+
+def test_process_document_stores_rules(api_client, tmp_path):
+    """Rules extracted by /process_document are served by /rules and /status."""
+    import fitz
+
+    pdf_path = tmp_path / "doctrine.pdf"
+    pdf = fitz.open()
+    pdf.new_page().insert_text((72, 72), "Units must coordinate jamming with the JFACC.\n"
+                                         "Units must not transmit on guard frequencies.")
+    pdf.save(str(pdf_path))
+    pdf.close()
+
+    response = api_client.post('/process_document', json={'file_path': str(pdf_path)})
+    assert response.status_code == 200
+    extracted = response.get_json()['rules']['total']
+    assert extracted > 0
+
+    rules = api_client.get('/rules').get_json()
+    assert rules['total'] == extracted
+    assert {rule['source_document'] for rule in rules['rules']} == {"doctrine.pdf"}
+
+    status = api_client.get('/status').get_json()
+    assert status['rules']['total_rules'] == extracted
 
 
 def main():
@@ -165,12 +480,12 @@ def main():
     for test_name, test_func in tests:
         print(f"\n🔍 Testing: {test_name}")
         try:
-            if test_func():
-                passed += 1
-            else:
-                print(f"❌ {test_name} failed")
+            test_func()
+            passed += 1
+        except pytest.skip.Exception as e:
+            print(f"⚠️  {test_name} skipped: {e}")
         except Exception as e:
-            print(f"❌ {test_name} failed with exception: {e}")
+            print(f"❌ {test_name} failed: {e}")
 
     print("\n" + "=" * 60)
     print(f"Test Results: {passed}/{total} tests passed")